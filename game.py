@@ -1,36 +1,196 @@
+import os
+import time
+
 from game_hud import *
 from game_music import *
+from game_render import *
+from game_collide import *
+from game_input import *
+from game_replay import *
+from game_entities import *
+from game_profiler import *
+from game_records import *
+from game_quality import *
+
+
+def init_headless():
+    """使用 SDL dummy 视频及音频驱动初始化 pygame，不需要真实的窗口和声卡"""
+
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+    # 已经使用其他驱动初始化过显示模块，需要重新初始化
+    if pygame.display.get_init() and pygame.display.get_driver() != "dummy":
+        pygame.display.quit()
+
+    pygame.init()
+
+    # 转换图像显示格式需要先设置显示模式
+    if pygame.display.get_surface() is None:
+        pygame.display.set_mode(SCREEN_RECT.size)
+
+
+# 游戏中使用的音效，其他音效文件不需要加载
+GAME_SOUNDS = ("bullet.wav", "supply.wav", "upgrade.wav", "use_bomb.wav",
+               "enemy1_down.wav", "enemy2_down.wav", "enemy3_down.wav",
+               "me_down.wav", "get_bomb.wav", "get_bullet.wav")
+
+# 各级别新增的敌机，每一项是 (敌机类型, 数量, 最大速度)，速度单位像素/秒，
+# 升级时已有的同类敌机也提高到该级别的最大速度
+LEVEL_ENEMIES = {
+    1: ((0, 16, 180),),
+    2: ((0, 8, 300), (1, 2, 60)),
+    3: ((0, 8, 420), (1, 2, 180), (2, 2, 60)),
+}
+
+LEVEL_UP_BUDGET = 1000 * SIM_STEP  # 升级所在模拟步的耗时上限，单位毫秒
+
+MAX_ELAPSED_TIME = 0.25  # 每次渲染之间累计模拟时间的上限，单位秒
+INTERPOLATE_LIMIT = 100  # 渲染插值的最大移动距离，单位像素
+
+
+def normalize_level_enemies(level_enemies):
+    """整理级别敌机表，从 JSON 读取的表中级别是字符串，每一项是列表
+
+    :param level_enemies: 级别敌机表，格式与 LEVEL_ENEMIES 相同
+    :return: 级别为整数、每一项为元组的级别敌机表
+    """
+    return {int(level): tuple(tuple(composition) for composition in compositions)
+            for level, compositions in level_enemies.items()}
 
 
 class Game(object):
     """游戏类"""
 
-    def __init__(self):
+    def __init__(self, render_mode="full", collide_mode="hash",
+                 headless=False, seed=None, input_source=None,
+                 max_fps=60, time_scale=1.0, entity_backend="sprite",
+                 profile=False, profile_csv=None, is_render=True,
+                 narrowphase="mask", record_store=None, adaptive=False,
+                 quality_log=None, level_enemies=None):
+        """初始化方法
+
+        :param render_mode: 渲染模式，full 每帧刷新整个窗口，dirty 只刷新变化区域
+        :param collide_mode: 碰撞检测模式，hash 使用空间哈希宽相位，brute 逐对检测
+        :param headless: 是否无头运行，无头运行时没有窗口和声音，按照模拟时间尽快运行
+        :param seed: 随机数种子，不传则使用系统随机源
+        :param input_source: 输入源，不传时有窗口使用键盘输入，无头运行保持不动
+        :param max_fps: 有窗口时的最大渲染帧率，0 表示不限制，尽可能多地渲染，会占满 1 个 CPU 核心
+        :param time_scale: 模拟时间相对真实时间的倍数，大于 1 表示快进
+        :param entity_backend: 敌机和子弹的运动后端，sprite 逐个精灵更新，numpy 使用数组向量运算
+        :param profile: 是否启用帧耗时分析，游戏中按 F3 切换
+        :param profile_csv: 退出时保存帧耗时记录的 CSV 文件名，不传则不保存
+        :param is_render: 无头运行时是否渲染画面，不渲染时只运行模拟，用于快速回放录像
+        :param narrowphase: 窄相位模式，mask 直接比较遮罩，tiered 分级检测并缓存结果
+        :param record_store: 成绩存储，不传则不保存成绩，无头运行通常不传
+        :param adaptive: 有窗口时是否根据帧耗时自动跳过渲染并降低画面和音效质量
+        :param quality_log: 退出时保存质量调整记录的 CSV 文件名，不传则不保存
+        :param level_enemies: 各级别新增的敌机，格式与 LEVEL_ENEMIES 相同，不传则使用 LEVEL_ENEMIES
+        """
+        self.headless = headless
+        self.is_render = is_render
+        self.max_fps = max_fps
+        self.time_scale = time_scale
+
         # 1. 游戏主窗口
-        self.main_window = pygame.display.set_mode(SCREEN_RECT.size)
-        pygame.display.set_caption("飞机大战")
+        if headless:
+            # 绘制到独立的表面，多个无头游戏之间互不影响
+            init_headless()
+
+            self.main_window = pygame.Surface(SCREEN_RECT.size).convert()
+        else:
+            self.main_window = pygame.display.set_mode(SCREEN_RECT.size)
+            pygame.display.set_caption("飞机大战")
+
+        # 随机数生成器
+        self.rng = random.Random(seed)
+
+        # 调度器，计划任务按照模拟时间执行，暂停和游戏结束时不推进
+        self.scheduler = Scheduler()
+        self.enhanced_task = None  # 关闭子弹增强的任务
+
+        # 输入源
+        if input_source is None:
+            input_source = ScriptedInput() if headless else KeyboardInput()
+        self.input_source = input_source
+
+        # 敌机和子弹的运动后端
+        if entity_backend == "numpy":
+            self.enemy_store = EnemyStore(self.rng)
+            self.bullet_store = BulletStore()
+
+            self.create_enemy = self.enemy_store.create_enemy
+            bullet_factory = self.bullet_store.create_bullet
+        else:
+            self.enemy_store = None
+            self.bullet_store = None
+
+            self.create_enemy = Enemy
+            bullet_factory = Bullet
+
+        # 滚动背景及渲染器，背景由渲染器在精灵之前绘制
+        self.background = Background()
+        self.renderer = RENDERERS[render_mode](self.main_window, self.background)
+
+        # 碰撞检测器
+        # 窗口外的精灵不参与碰撞检测
+        self.collider = COLLIDERS[collide_mode](NARROWPHASES[narrowphase](),
+                                                SCREEN_RECT)
+
+        # 帧耗时分析器
+        self.profiler = FrameProfiler(enabled=profile)
+        self.profile_csv = profile_csv
+
+        # 自适应质量控制器，无头运行时每步都渲染，不调整质量
+        self.quality = QualityController(budget_ms=1000 / (max_fps or QUALITY_TARGET_FPS),
+                                         enabled=adaptive and not headless,
+                                         on_change=self.apply_quality)
+        self.quality_log = quality_log
 
         # 2. 游戏状态属性
         self.is_game_over = True  # 游戏结束标记
         self.is_pause = False  # 游戏暂停标记
+        self.frame_count = 0  # 已运行的模拟步数
+        self.frame_counter = 0  # 逐帧动画计数器
+        self.move_hor = 0  # 当前步的水平移动基数
+        self.move_ver = 0  # 当前步的垂直移动基数
+        self.last_positions = {}  # 上一步精灵的位置，用于渲染插值
+
+        # 本局统计，游戏结束时写入成绩存储
+        self.record_store = record_store
+        self.session_time = 0.0  # 本局开始时的模拟时间，单位毫秒
+        self.kill_counts = [0, 0, 0]  # 各类敌机的击毁数量
+        self.is_session_saved = False  # 本局是否已经保存
 
         # 3. 精灵组属性
-        self.all_group = pygame.sprite.Group()  # 所有精灵组
+        self.all_group = pygame.sprite.Group()  # 所有参与更新的精灵组
         self.enemies_group = pygame.sprite.Group()  # 敌机精灵组
+        self.hero_group = pygame.sprite.Group()  # 英雄精灵组
         self.supplies_group = pygame.sprite.Group()  # 道具精灵组
+        self.hud_group = pygame.sprite.Group()  # 指示器面板精灵组，不参与更新，显示在最上方
+
+        # 升级统计
+        self.level_enemies = normalize_level_enemies(level_enemies or LEVEL_ENEMIES)  # 级别敌机表
+        self.enemy_level = 0  # 已经启用的敌机级别
+        self.level_up_times = []  # 每次升级所在模拟步的耗时，单位毫秒
 
         # 4. 创建精灵
-        # 背景精灵，交替滚动
-        self.all_group.add(Background(False), Background(True))
+        # 指示器面板，成绩存储在后台线程中打开数据库，游戏循环开始之前等待最好成绩加载完成
+        best_score = 0
+        if record_store is not None:
+            record_store.ready.wait()
+            best_score = record_store.best_score
 
-        # 指示器面板
-        self.hud_panel = HUDPanel(self.all_group)
+        self.hud_panel = HUDPanel(self.hud_group, best_score)
 
-        # 创建敌机
+        # 预先创建全部级别的敌机，再启用级别 1 的敌机
+        self.enemy_reserve = self.create_enemy_reserve()
         self.create_enemies()
 
         # 英雄精灵
-        self.hero = Hero(self.all_group)
+        self.hero = Hero(self.all_group, self.hero_group, scheduler=self.scheduler,
+                         on_fire=self.hero_fire, on_dead=self.hero_dead,
+                         bullet_factory=bullet_factory)
 
         # 设置面板中炸弹数量
         self.hud_panel.show_bomb(self.hero.bomb_count)
@@ -39,49 +199,52 @@ class Game(object):
         self.create_supplies()
 
         # 5. 创建音乐播放器
-        self.player = MusicPlayer("game_music.ogg")
+        self.player = MusicPlayer("game_music.ogg", is_silent=headless,
+                                  sound_names=GAME_SOUNDS)
         self.player.play_music()
 
     def create_supplies(self):
         """创建道具"""
-        Supply(0, self.supplies_group, self.all_group)
-        Supply(1, self.supplies_group, self.all_group)
+        Supply(0, self.supplies_group, self.all_group, rng=self.rng)
+        Supply(1, self.supplies_group, self.all_group, rng=self.rng)
+
+        # 每 10s 投放道具
+        self.scheduler.call_every(THROW_SUPPLY_INTERVAL, self.throw_supply)
+
+    def create_enemy_reserve(self):
+        """按照级别敌机表预先创建全部级别的敌机，升级时只需要启用，不需要在游戏中加载图像
+
+        :return: 级别对应的预备敌机列表，每一项是 (最大速度, 敌机)
+        """
+        reserve = {}
+
+        for level, compositions in sorted(self.level_enemies.items()):
+            reserve[level] = [(max_speed, self.create_enemy(kind, max_speed, rng=self.rng,
+                                                            is_reserve=True))
+                              for kind, count, max_speed in compositions
+                              for i in range(count)]
 
-        # 设置 30s 投放道具定时器事件
-        pygame.time.set_timer(THROW_SUPPLY_EVENT, 10000)
+        return reserve
 
     def create_enemies(self):
-        """根据游戏级别创建不同数量的敌机"""
+        """根据游戏级别启用预备敌机，跳过的级别依次启用，级别敌机表中没有的级别不新增敌机"""
 
-        # 敌机精灵组中的精灵数量
-        count = len(self.enemies_group.sprites())
         # 要添加到的精灵组
         groups = (self.all_group, self.enemies_group)
 
-        # 判断游戏级别及已有的敌机数量
-        if self.hud_panel.level == 1 and count == 0:  # 关卡 1
-            for i in range(16):
-                Enemy(0, 3, *groups)
-        elif self.hud_panel.level == 2 and count == 16:  # 关卡 2
-            # 1> 增加敌机的最大速度
-            for enemy in self.enemies_group.sprites():
-                enemy.max_speed = 5
-            # 2> 创建敌机
-            for i in range(8):
-                Enemy(0, 5, *groups)
-            for i in range(2):
-                Enemy(1, 1, *groups)
-        elif self.hud_panel.level == 3 and count == 26:  # 关卡 3
-            # 1> 增加敌机的最大速度
+        while self.enemy_level < self.hud_panel.level:
+            self.enemy_level += 1
+
+            # 1> 增加已有敌机的最大速度
+            speeds = {kind: max_speed
+                      for kind, count, max_speed in self.level_enemies.get(self.enemy_level, ())}
+
             for enemy in self.enemies_group.sprites():
-                enemy.max_speed = 7 if enemy.kind == 0 else 3
-            # 2> 创建敌机
-            for i in range(8):
-                Enemy(0, 7, *groups)
-            for i in range(2):
-                Enemy(1, 3, *groups)
-            for i in range(2):
-                Enemy(2, 1, *groups)
+                enemy.max_speed = speeds.get(enemy.kind, enemy.max_speed)
+
+            # 2> 启用敌机
+            for max_speed, enemy in self.enemy_reserve.get(self.enemy_level, ()):
+                enemy.activate(max_speed, *groups)
 
     def reset_game(self):
         """重设游戏"""
@@ -90,18 +253,25 @@ class Game(object):
 
         self.hud_panel.reset_panel()  # 重置指示器面板
 
+        # 重置本局统计
+        self.session_time = self.scheduler.now
+        self.kill_counts = [0, 0, 0]
+        self.is_session_saved = False
+
         # 设置英雄的初始位置
         self.hero.rect.midbottom = HERO_DEFAULT_MID_BOTTOM
 
-        # 清空所有敌机
+        # 停用所有敌机
         for enemy in self.enemies_group:
-            enemy.kill()
+            enemy.deactivate()
+
+        self.enemy_level = 0
 
         # 清空残留子弹
         for bullet in self.hero.bullets_group:
             bullet.kill()
 
-        # 重新创建敌机
+        # 重新启用级别 1 的敌机
         self.create_enemies()
 
     def event_handler(self):
@@ -109,12 +279,29 @@ class Game(object):
 
         :return: 如果监听到退出事件，返回 True，否则返回 False
         """
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                return True
-            elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+        # 无头运行不读取 pygame 的全局事件队列，
+        # 有窗口时先检查关闭窗口事件，退出的这一步不读取输入源，录像中不会多记录 1 步
+        if not self.headless and pygame.event.get(pygame.QUIT):
+            return True
+
+        # 读取输入源
+        self.move_hor, self.move_ver, keys_down = self.input_source.poll(self)
+
+        # 按键只从输入源读取，回放录像时玩家的按键不会影响游戏，
+        # 丢弃其余事件，之后到达的关闭窗口事件留到下一步处理
+        if not self.headless:
+            pygame.event.get(exclude=pygame.QUIT)
+
+        # 正在游戏时推进模拟时间，执行到期的计划任务
+        if not self.is_game_over and not self.is_pause:
+            self.scheduler.advance(FRAME_MILLIS)
+
+        for key in keys_down:
+            if key == pygame.K_ESCAPE:
                 return True
-            elif event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+            elif key == pygame.K_F3:
+                self.profiler.toggle()  # 切换帧耗时浮层
+            elif key == pygame.K_SPACE:
                 if self.is_game_over:  # 游戏已经结束
                     self.reset_game()
                 else:  # 切换暂停状态
@@ -123,122 +310,324 @@ class Game(object):
                     # 暂停或恢复背景音乐
                     self.player.pause_music(self.is_pause)
 
-            # 判断是否正在游戏
-            if not self.is_game_over and not self.is_pause:
-                # 监听关闭子弹增强事件
-                if event.type == BULLET_ENHANCED_OFF_EVENT:
-                    self.hero.bullets_kind = 0
+            # 监听玩家按下字母 b，引爆炸弹
+            elif key == pygame.K_b and not self.is_game_over and not self.is_pause:
+                # 如果英雄没有牺牲同时有炸弹
+                if self.hero.hp > 0 and self.hero.bomb_count > 0:
+                    self.player.play_sound("use_bomb.wav")
+
+                    # 统计窗口内将被炸毁的敌机
+                    self.count_kills(enemy for enemy in self.enemies_group
+                                     if enemy.rect.bottom > 0 and enemy.hp > 0)
 
-                    pygame.time.set_timer(BULLET_ENHANCED_OFF_EVENT, 0)
+                # 引爆炸弹
+                score = self.hero.blowup(self.enemies_group)
 
-                # 监听投放道具事件
-                if event.type == THROW_SUPPLY_EVENT:
-                    self.player.play_sound("supply.wav")
+                # 更新炸弹数量显示
+                self.hud_panel.show_bomb(self.hero.bomb_count)
 
-                    supply = random.choice(self.supplies_group.sprites())
+                # 更新游戏得分，如果游戏等级提升，创建新的敌机
+                if self.hud_panel.increase_score(score):
+                    self.create_enemies()
 
-                    supply.throw_supply()
+        return False
 
-                # 监听发射子弹事件
-                if event.type == HERO_FIRE_EVENT:
-                    self.player.play_sound("bullet.wav")
+    def hero_fire(self):
+        """英雄发射子弹，由调度器每 0.2 秒调用"""
 
-                    self.hero.fire(self.all_group)
+        self.player.play_sound("bullet.wav")
 
-                # 监听取消英雄无敌事件
-                if event.type == HERO_POWER_OFF_EVENT:
-                    print("取消无敌状态...")
+        self.hero.fire(self.all_group)
 
-                    # 设置英雄属性
-                    self.hero.is_power = False
+    def hero_dead(self):
+        """英雄牺牲，由调度器在英雄重置之后调用"""
 
-                    # 取消定时器
-                    pygame.time.set_timer(HERO_POWER_OFF_EVENT, 0)
+        print("英雄牺牲了...")
 
-                # 监听英雄牺牲事件
-                if event.type == HERO_DEAD_EVENT:
-                    print("英雄牺牲了...")
+        # 生命计数 -1
+        self.hud_panel.lives_count -= 1
 
-                    # 生命计数 -1
-                    self.hud_panel.lives_count -= 1
+        # 更新生命计数显示
+        self.hud_panel.show_lives()
+        # 更新炸弹显示
+        self.hud_panel.show_bomb(self.hero.bomb_count)
 
-                    # 更新生命计数显示
-                    self.hud_panel.show_lives()
-                    # 更新炸弹显示
-                    self.hud_panel.show_bomb(self.hero.bomb_count)
+    def throw_supply(self):
+        """投放道具，由调度器每 10 秒调用"""
 
-                # 监听玩家按下字母 b，引爆炸弹
-                if event.type == pygame.KEYDOWN and event.key == pygame.K_b:
-                    # 如果英雄没有牺牲同时有炸弹
-                    if self.hero.hp > 0 and self.hero.bomb_count > 0:
-                        self.player.play_sound("use_bomb.wav")
+        self.player.play_sound("supply.wav")
 
-                    # 引爆炸弹
-                    score = self.hero.blowup(self.enemies_group)
+        supply = self.rng.choice(self.supplies_group.sprites())
 
-                    # 更新炸弹数量显示
-                    self.hud_panel.show_bomb(self.hero.bomb_count)
+        supply.throw_supply()
 
-                    # 更新游戏得分，如果游戏等级提升，创建新的敌机
-                    if self.hud_panel.increase_score(score):
-                        self.create_enemies()
+    def bullets_enhanced_off(self):
+        """关闭子弹增强"""
 
-        return False
+        self.hero.bullets_kind = 0
+        self.enhanced_task = None
+
+    def count_kills(self, enemies):
+        """累计本局各类敌机的击毁数量
+
+        :param enemies: 被击毁的敌机
+        """
+        for enemy in enemies:
+            self.kill_counts[enemy.kind] += 1
+
+    def save_session(self):
+        """将本局统计放入成绩存储的写入队列，不等待写入磁盘，每局只保存 1 次"""
+
+        if self.record_store is None or self.is_session_saved:
+            return
+
+        self.is_session_saved = True
+
+        # 暂停和游戏结束时模拟时间不推进，时长只包含游戏进行的时间
+        self.record_store.add_session(self.hud_panel.score, self.hud_panel.level,
+                                      (self.scheduler.now - self.session_time) / 1000,
+                                      self.kill_counts)
+
+    def close(self):
+        """关闭音乐播放器及成绩存储，等待剩余的成绩写入磁盘"""
+
+        self.player.close()
 
-    def start(self):
-        """开始游戏"""
+        if self.record_store is not None:
+            self.record_store.close()
+
+    def apply_quality(self, quality):
+        """按照质量控制器的级别开关背景滚动和音效，由控制器在级别变化时调用
+
+        :param quality: 质量控制器
+        """
+        print("画面质量调整为 %d 级，平均循环耗时 %.2f 毫秒" % (quality.level, quality.frame_ms))
+
+        self.background.is_parallax = quality.is_parallax
+        self.player.is_sound_enabled = quality.is_sound
+
+    def start(self, max_frames=None):
+        """开始游戏
+
+        模拟按照固定的步长运行，与渲染频率无关，有窗口时每次渲染之前
+        按照经过的时间模拟若干步，无头运行时每次循环模拟 1 步
+
+        :param max_frames: 最多运行的模拟步数，不传则一直运行到退出
+        """
 
         clock = pygame.time.Clock()  # 游戏时钟
-        frame_counter = 0  # 逐帧动画计数器
+        accumulator = 0.0  # 尚未模拟的时间，单位秒
+        is_quit = False  # 退出标记
+
+        while not is_quit and (max_frames is None or self.frame_count < max_frames):
+            # 无头运行时不限制帧率，尽快运行
+            if self.headless:
+                self.profiler.start_frame()
+                is_quit = self.step()
+
+                if not is_quit and self.is_render:
+                    self.render(1.0)
+                elif not is_quit:
+                    # 不渲染时只记录模拟阶段的耗时
+                    self.profiler.end_frame(len(self.enemies_group),
+                                            len(self.hero.bullets_group))
+
+                continue
+
+            # 累计经过的时间，限制单次累计的最大值，避免卡顿之后连续模拟过多步
+            elapsed = clock.tick(self.max_fps) / 1000
+            frame_start = time.perf_counter()
+
+            # 限制帧率等待的时间不计入帧耗时
+            self.profiler.start_frame()
+            accumulator += min(elapsed, MAX_ELAPSED_TIME) * self.time_scale
+
+            while accumulator >= SIM_STEP and not is_quit:
+                if max_frames is not None and self.frame_count >= max_frames:
+                    break
+
+                # 记录精灵在模拟之前的位置
+                self.last_positions = {sprite: sprite.rect.topleft
+                                       for sprite in self.all_group}
+
+                is_quit = self.step()
+                accumulator -= SIM_STEP
+
+            # 负载过高时跳过部分渲染，模拟仍然按照真实时间运行，跳过渲染的循环也计入负载
+            if not is_quit:
+                is_rendered = self.quality.should_render()
+
+                if is_rendered:
+                    self.render(accumulator / SIM_STEP)
+
+                self.quality.end_pass((time.perf_counter() - frame_start) * 1000,
+                                      is_rendered, self.frame_count)
+
+        # 中途退出时保存没有结束的一局
+        if self.frame_count > 0:
+            self.save_session()
+
+        if self.profile_csv is not None:
+            self.profiler.save_csv(self.profile_csv)
+
+        if self.quality_log is not None and self.quality.enabled:
+            self.quality.save_log(self.quality_log)
+
+    def step(self):
+        """模拟 1 个固定步长
+
+        :return: 如果监听到退出事件，返回 True，否则返回 False
+        """
+        start_time = time.perf_counter()
+        enemy_level = self.enemy_level
+
+        self.frame_count += 1
+
+        # 生命计数等于 0，表示游戏结束
+        is_game_over = self.hud_panel.lives_count == 0
+
+        # 游戏刚刚结束，保存本局统计
+        if is_game_over and not self.is_game_over:
+            self.save_session()
+
+        self.is_game_over = is_game_over
+
+        is_quit = self.event_handler()  # 事件监听
+        self.profiler.mark("event_handler")
+
+        if is_quit:
+            return True
+
+        # 判断游戏状态
+        if self.is_game_over:
+            self.hud_panel.panel_pause(True, self.hud_group)
+        elif self.is_pause:
+            self.hud_panel.panel_pause(False, self.hud_group)
+        else:
+            self.hud_panel.panel_resume(self.hud_group)
+
+            # 碰撞检测
+            self.profiler.skip()
+            self.check_collide()
+            self.profiler.mark("check_collide")
+
+            # 修改逐帧动画计数器
+            self.frame_counter = (self.frame_counter + 1) % FRAME_INTERVAL
+
+            # 滚动背景
+            self.background.update()
 
-        while True:
-            # 生命计数等于 0，表示游戏结束
-            self.is_game_over = self.hud_panel.lives_count == 0
+            # 更新 all_group 中所有精灵内容
+            self.all_group.update(self.frame_counter == 0,
+                                  self.move_hor, self.move_ver)
 
-            if self.event_handler():  # 事件监听
-                self.hud_panel.save_best_score()
+            # 使用数组后端时，批量更新敌机和子弹的位置
+            if self.enemy_store is not None:
+                self.enemy_store.update(self.frame_counter == 0)
+                self.bullet_store.update(self.frame_counter == 0)
 
-                return
+            self.profiler.mark("update")
 
-            # 判断游戏状态
-            if self.is_game_over:
-                self.hud_panel.panel_pause(True, self.all_group)
-            elif self.is_pause:
-                self.hud_panel.panel_pause(False, self.all_group)
-            else:
-                self.hud_panel.panel_resume(self.all_group)
+        # 记录升级所在模拟步的耗时
+        if self.enemy_level > enemy_level:
+            self.record_level_up((time.perf_counter() - start_time) * 1000)
 
-                # 碰撞检测
-                self.check_collide()
+        return False
+
+    def record_level_up(self, millis):
+        """记录升级所在模拟步的耗时，超过上限时输出提示
+
+        :param millis: 耗时毫秒数
+        """
+        self.level_up_times.append(millis)
+
+        if millis > LEVEL_UP_BUDGET:
+            print("升级到级别 %d 耗时 %.2f 毫秒，超过上限 %.2f 毫秒" %
+                  (self.enemy_level, millis, LEVEL_UP_BUDGET))
+
+    def level_up_stats(self):
+        """升级耗时统计
+
+        :return: 统计字典
+        """
+        times = self.level_up_times
+
+        return {"level_ups": len(times),
+                "worst_ms": max(times) if times else 0.0,
+                "budget_ms": LEVEL_UP_BUDGET}
+
+    def render(self, alpha):
+        """渲染画面，精灵显示在上一步和当前步的位置之间
+
+        :param alpha: 插值系数，0 表示上一步的位置，1 表示当前步的位置
+        """
+        # 1. 将移动的精灵设置到插值位置，跳跃距离过大的精灵（例如重置位置）不插值
+        moved = []
+        for sprite in self.all_group:
+            last_position = self.last_positions.get(sprite)
+
+            if last_position is None:
+                continue
 
-                # 获得当前时刻的按键元组
-                keys = pygame.key.get_pressed()
-                # 水平移动基数
-                move_hor = keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]
-                # 垂直移动基数
-                move_ver = keys[pygame.K_DOWN] - keys[pygame.K_UP]
+            rect = sprite.rect
+            dx = rect.x - last_position[0]
+            dy = rect.y - last_position[1]
 
-                # 修改逐帧动画计数器
-                frame_counter = (frame_counter + 1) % FRAME_INTERVAL
+            if (dx or dy) and abs(dx) + abs(dy) <= INTERPOLATE_LIMIT:
+                moved.append((rect, rect.topleft))
 
-                # 更新 all_group 中所有精灵内容
-                self.all_group.update(frame_counter == 0, move_hor, move_ver)
+                rect.topleft = (last_position[0] + round(dx * alpha),
+                                last_position[1] + round(dy * alpha))
 
-            # 绘制 all_group 中的所有精灵
-            self.all_group.draw(self.main_window)
+        # 2. 绘制背景及各层精灵
+        self.profiler.skip()
+        self.background.interpolate(alpha)
+        rects = self.renderer.draw(self.sprite_layers())
 
-            pygame.display.update()  # 更新显示
-            clock.tick(60)  # 设置刷新帧率
+        # 3. 恢复精灵的模拟位置
+        for rect, position in moved:
+            rect.topleft = position
+
+        # 4. 绘制帧耗时浮层，下一帧重绘浮层下方的背景和精灵，
+        #    关闭浮层之后不会残留，暂停时半透明的浮层也不会逐帧叠加变暗
+        overlay_rect = self.profiler.draw_overlay(self.main_window)
+        if overlay_rect is not None:
+            self.renderer.invalidate(overlay_rect)
+
+            if rects is not None:
+                rects.append(overlay_rect)
+
+        self.profiler.mark("draw")
+
+        # 5. 更新显示
+        self.renderer.present(rects)
+
+        self.profiler.mark("present")
+        self.profiler.end_frame(len(self.enemies_group),
+                                len(self.hero.bullets_group),
+                                self.renderer.culled_count)
+
+    def sprite_layers(self):
+        """按照从下到上的绘制顺序排列的精灵层，降低质量时不绘制被摧毁的飞机
+
+        :return: 敌机、子弹、英雄、道具、指示器面板 5 层精灵组列表
+        """
+        layers = [self.enemies_group, self.hero.bullets_group, self.hero_group,
+                  self.supplies_group, self.hud_group]
+
+        if not self.quality.is_destroy_animation:
+            for index in (0, 2):
+                layers[index] = [plane for plane in layers[index] if plane.hp > 0]
+
+        return layers
 
     def check_collide(self):
         """碰撞检测"""
 
         # 1. 检测英雄飞机和敌机的碰撞 - 如果英雄处于无敌状态，彼此不能碰撞
         if not self.hero.is_power:
-            enemies = pygame.sprite.spritecollide(self.hero,
-                                                  self.enemies_group,
-                                                  False,
-                                                  pygame.sprite.collide_mask)
+            enemies = self.collider.spritecollide(self.hero,
+                                                  self.enemies_group)
 
             # 过滤掉已经被摧毁的敌机
             enemies = list(filter(lambda x: x.hp > 0, enemies))
@@ -253,12 +642,11 @@ class Game(object):
             for enemy in enemies:
                 enemy.hp = 0  # 敌机同样被撞毁
 
+            self.count_kills(enemies)
+
         # 2. 检测敌机被子弹击中
-        hit_enemies = pygame.sprite.groupcollide(self.enemies_group,
-                                                 self.hero.bullets_group,
-                                                 False,
-                                                 False,
-                                                 pygame.sprite.collide_mask)
+        hit_enemies = self.collider.groupcollide(self.enemies_group,
+                                                 self.hero.bullets_group)
 
         # 遍历字典
         for enemy in hit_enemies:
@@ -280,6 +668,8 @@ class Game(object):
                 if enemy.hp > 0:
                     continue
 
+                self.count_kills((enemy,))
+
                 # 4> 修改游戏得分并判断是否升级
                 if self.hud_panel.increase_score(enemy.value):
                     # 播放升级音效
@@ -294,10 +684,8 @@ class Game(object):
                 break
 
         # 3. 英雄拾取道具
-        supplies = pygame.sprite.spritecollide(self.hero,
-                                               self.supplies_group,
-                                               False,
-                                               pygame.sprite.collide_mask)
+        supplies = self.collider.spritecollide(self.hero,
+                                               self.supplies_group)
         if supplies:
             supply = supplies[0]
 
@@ -314,13 +702,130 @@ class Game(object):
             else:  # 设置子弹增强
                 self.hero.bullets_kind = 1
 
-                # 设置关闭子弹增强的定时器事件
-                pygame.time.set_timer(BULLET_ENHANCED_OFF_EVENT, 8000)
+                # 8 秒之后关闭子弹增强，重复拾取时重新计时
+                self.scheduler.cancel(self.enhanced_task)
+                self.enhanced_task = self.scheduler.call_later(BULLET_ENHANCED_TIME,
+                                                               self.bullets_enhanced_off)
 
 
 if __name__ == '__main__':
-    pygame.init()
-
-    Game().start()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="飞机大战")
+    parser.add_argument("--render", choices=sorted(RENDERERS), default="full",
+                        help="渲染模式")
+    parser.add_argument("--collide", choices=sorted(COLLIDERS), default="hash",
+                        help="碰撞检测模式")
+    parser.add_argument("--narrowphase", choices=sorted(NARROWPHASES), default="mask",
+                        help="窄相位碰撞检测模式")
+    parser.add_argument("--entities", choices=("sprite", "numpy"), default="sprite",
+                        help="敌机和子弹的运动后端")
+    parser.add_argument("--profile", action="store_true",
+                        help="启用帧耗时分析浮层，游戏中按 F3 切换")
+    parser.add_argument("--profile-csv", default=None,
+                        help="退出时保存帧耗时记录的 CSV 文件名")
+    parser.add_argument("--headless", action="store_true",
+                        help="无头运行，没有窗口和声音，尽快运行指定的帧数")
+    parser.add_argument("--frames", type=int, default=None,
+                        help="无头运行的模拟步数，默认 3600 步，回放录像时默认运行到录像结束")
+    parser.add_argument("--no-render", action="store_true",
+                        help="无头运行时不渲染画面，只运行模拟")
+    parser.add_argument("--record", default=None,
+                        help="将随机数种子和玩家输入记录到指定的录像文件")
+    parser.add_argument("--replay", default=None,
+                        help="回放指定的录像文件")
+    parser.add_argument("--max-fps", type=int, default=60,
+                        help="最大渲染帧率，0 表示不限制，会占满 1 个 CPU 核心")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="模拟时间相对真实时间的倍数")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="随机数种子")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="根据帧耗时自动跳过渲染并降低画面和音效质量")
+    parser.add_argument("--quality-log", default="quality_log.csv",
+                        help="启用自动质量调整时，退出时保存调整记录的 CSV 文件名")
+    parser.add_argument("--records", default=RecordStore.db_filename,
+                        help="保存成绩的数据库文件名，无头运行和回放录像时不保存")
+    options = parser.parse_args()
+
+    if options.headless:
+        init_headless()
+    else:
+        pygame.init()
+
+    seed = options.seed
+    input_source = None
+    frames = options.frames
+    entity_backend = options.entities
+
+    if options.replay is not None:
+        # 回放录像，使用录像中的随机数种子和实体后端，默认运行到录像结束
+        input_source = ReplayInput(options.replay)
+        seed = input_source.seed
+        entity_backend = input_source.entity_backend
+
+        if frames is None:
+            frames = input_source.frame_count
+    elif options.record is not None:
+        # 录像需要保存随机数种子，没有指定时随机生成一个
+        if seed is None:
+            seed = random.getrandbits(63)
+
+        recorded_source = ScriptedInput() if options.headless else KeyboardInput()
+        input_source = ReplayRecorder(recorded_source, options.record, seed,
+                                      entity_backend)
+
+    if frames is None:
+        frames = 3600
+
+    # 无头运行和回放录像不是玩家的成绩
+    record_store = None
+    if not options.headless and options.replay is None:
+        record_store = RecordStore(options.records)
+
+    game = Game(render_mode=options.render, collide_mode=options.collide,
+                headless=options.headless, seed=seed, input_source=input_source,
+                max_fps=options.max_fps, time_scale=options.time_scale,
+                entity_backend=entity_backend,
+                profile=options.profile or options.profile_csv is not None,
+                profile_csv=options.profile_csv,
+                is_render=not options.no_render,
+                narrowphase=options.narrowphase,
+                record_store=record_store,
+                adaptive=options.adaptive,
+                quality_log=options.quality_log)
+
+    if options.headless:
+        start_time = time.perf_counter()
+        game.start(frames)
+        elapsed = time.perf_counter() - start_time
+
+        print("运行 %d 步，耗时 %.2f 秒，%.1f 步/秒，得分 %d" %
+              (game.frame_count, elapsed, game.frame_count / elapsed,
+               game.hud_panel.score))
+    elif options.replay is not None:
+        game.start(frames)
+    else:
+        game.start()
+
+    if options.record is not None and options.replay is None:
+        input_source.close(game)
+
+        print("录像已保存到 %s，种子 %d，共 %d 条输入记录" %
+              (options.record, seed, input_source.run_count))
+
+    if options.replay is not None:
+        print("回放结果与录像%s" % ("一致" if input_source.verify(game) else "不一致"))
+
+    game.close()
+
+    print("图像缓存统计: %s" % assets.stats())
+    print("渲染统计: %s" % game.renderer.stats())
+    print("碰撞统计: %s" % game.collider.stats())
+    print("子弹池统计: %s" % game.hero.bullet_pool.stats())
+    print("升级统计: %s" % game.level_up_stats())
+
+    if game.quality.enabled:
+        print("质量统计: %s" % game.quality.stats())
 
     pygame.quit()
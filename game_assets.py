@@ -0,0 +1,158 @@
+import json
+import pygame
+
+
+class AssetManager(object):
+    """资源管理器类
+
+    进程内共享的图像及遮罩缓存，每个图片文件只加载一次，
+    加载后转换为显示格式，所有精灵共享同一个图像和遮罩对象。
+    存在资源包时，从图集中截取图像，并使用预先计算的遮罩
+    """
+
+    res_path = "./res/images/"  # 图片资源路径
+    pack_path = "./res/pack/"  # 资源包路径
+    manifest_name = "manifest.json"  # 资源包清单文件名
+
+    def __init__(self):
+        """初始化方法"""
+
+        self.images = {}  # 图像缓存字典，使用文件名作为字典的 key
+        self.masks = {}  # 遮罩缓存字典，使用文件名作为字典的 key
+
+        self.manifest = None  # 资源包清单，没有资源包时为 None
+        self.atlas = None  # 资源包图集
+        self.is_pack_checked = False  # 是否已经检查过资源包
+        self.fill_masks = {}  # 填满的遮罩字典，key 是尺寸，用于还原预先计算的遮罩
+
+        # 缓存统计
+        self.hits = 0  # 命中次数
+        self.misses = 0  # 未命中次数
+        self.file_count = 0  # 打开的文件数量
+
+    def load_pack(self):
+        """加载资源包，没有资源包时继续使用单独的图片文件"""
+
+        self.is_pack_checked = True
+
+        try:
+            with open(self.pack_path + self.manifest_name) as file:
+                manifest = json.load(file)
+        except FileNotFoundError:
+            return
+
+        atlas = pygame.image.load(self.pack_path + manifest["atlas"])
+        self.file_count += 2
+
+        if pygame.display.get_surface() is not None:
+            atlas = atlas.convert_alpha()
+
+        self.manifest = manifest
+        self.atlas = atlas
+
+    def load_image(self, image_name):
+        """加载图像，已经加载过的图像直接返回缓存
+
+        :param image_name: 要加载的图片文件名
+        :return: 转换为显示格式的图像
+        """
+        image = self.images.get(image_name)
+
+        if image is not None:
+            self.hits += 1
+
+            return image
+
+        self.misses += 1
+
+        if not self.is_pack_checked:
+            self.load_pack()
+
+        if self.manifest is not None and image_name in self.manifest["frames"]:
+            # 图集中的子表面与图集共享像素，不需要再次转换格式
+            image = self.atlas.subsurface(self.manifest["frames"][image_name])
+        else:
+            image = pygame.image.load(self.res_path + image_name)
+            self.file_count += 1
+
+            # 已经创建游戏窗口时，转换为显示格式，避免每次绘制时转换像素格式
+            if pygame.display.get_surface() is not None:
+                image = image.convert_alpha()
+
+        self.images[image_name] = image
+
+        return image
+
+    def load_mask(self, image_name):
+        """加载图像遮罩，遮罩与图像一样只创建一次
+
+        :param image_name: 图片文件名
+        :return: 图像遮罩
+        """
+        mask = self.masks.get(image_name)
+
+        if mask is not None:
+            self.hits += 1
+
+            return mask
+
+        image = self.load_image(image_name)
+
+        if self.manifest is not None and image_name in self.manifest["masks"]:
+            mask = self.unpack_mask(image.get_size(),
+                                    self.manifest["masks"][image_name])
+        else:
+            mask = pygame.mask.from_surface(image)
+
+        self.masks[image_name] = mask
+
+        return mask
+
+    def unpack_mask(self, size, rects):
+        """使用预先计算的矩形列表还原遮罩
+
+        :param size: 遮罩尺寸
+        :param rects: 遮罩中所有设置位组成的矩形列表，每个矩形是 [x, y, w, h]
+        :return: 遮罩
+        """
+        mask = pygame.mask.Mask(size)
+
+        for x, y, w, h in rects:
+            fill_mask = self.fill_masks.get((w, h))
+
+            if fill_mask is None:
+                fill_mask = pygame.mask.Mask((w, h), fill=True)
+                self.fill_masks[(w, h)] = fill_mask
+
+            mask.draw(fill_mask, (x, y))
+
+        return mask
+
+    def stats(self):
+        """缓存统计
+
+        :return: 包含命中次数、未命中次数、打开的文件数量及缓存数量的字典
+        """
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "files": self.file_count,
+                "pack": self.manifest is not None,
+                "images": len(self.images),
+                "masks": len(self.masks)}
+
+    def clear(self):
+        """清空缓存及统计，下次加载时重新检查资源包"""
+        self.images.clear()
+        self.masks.clear()
+
+        self.manifest = None
+        self.atlas = None
+        self.is_pack_checked = False
+
+        self.hits = 0
+        self.misses = 0
+        self.file_count = 0
+
+
+# 进程内共享的资源管理器
+assets = AssetManager()
@@ -0,0 +1,350 @@
+"""微基准测试
+
+无头运行，使用固定的随机数种子分别测量游戏热点路径的耗时，结果保存为 JSON 文件，
+可以与保存的基准结果比较，耗时增加超过阈值时以非 0 状态退出
+
+    python game_bench.py                                     运行全部测试，保存到 bench_results.json
+    python game_bench.py --only collide                      只运行名称包含 collide 的测试
+    python game_bench.py --baseline bench_baseline.json      与基准结果比较
+"""
+import contextlib
+import gc
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+
+from game import *
+
+BENCH_SEED = 2024  # 基准测试使用的随机数种子
+WARM_STEPS = 600  # 创建游戏之后先运行的模拟步数，让敌机和子弹进入窗口
+STRESS_ENEMIES = 200  # 压力测试额外添加的敌机数量
+STRESS_BULLETS = 300  # 压力测试额外添加的子弹数量
+
+
+def create_game(level=1, warm_steps=WARM_STEPS):
+    """创建无头游戏，升级到指定级别，并运行若干步
+
+    :param level: 游戏级别
+    :param warm_steps: 运行的模拟步数
+    :return: 游戏对象
+    """
+    game = Game(headless=True, seed=BENCH_SEED, is_render=False)
+    hud_panel = game.hud_panel
+
+    if level >= 2:
+        hud_panel.increase_score(hud_panel.level2_score)
+    if level >= 3:
+        hud_panel.increase_score(hud_panel.level3_score - hud_panel.score)
+
+    game.create_enemies()
+
+    for i in range(warm_steps):
+        game.step()
+
+    return game
+
+
+def add_stress(game, enemy_count=STRESS_ENEMIES, bullet_count=STRESS_BULLETS):
+    """在窗口内随机位置添加额外的敌机和子弹
+
+    :param game: 游戏对象
+    :param enemy_count: 敌机数量
+    :param bullet_count: 子弹数量
+    """
+    rng = random.Random(BENCH_SEED)
+    groups = (game.all_group, game.enemies_group)
+
+    for i in range(enemy_count):
+        enemy = game.create_enemy(rng.choice((0, 0, 0, 1, 2)), 180, *groups, rng=rng)
+        enemy.dormant_steps = 0
+        enemy.rect.topleft = (rng.randint(0, SCREEN_RECT.w - enemy.rect.w),
+                              rng.randint(0, SCREEN_RECT.h - enemy.rect.h))
+
+    for i in range(bullet_count):
+        bullet = Bullet(0, game.hero.bullets_group, game.all_group)
+        bullet.place((rng.randint(0, SCREEN_RECT.w), rng.randint(0, SCREEN_RECT.h)))
+
+
+def snapshot(game):
+    """保存全部精灵的位置、生命值和所属精灵组
+
+    :param game: 游戏对象
+    :return: 恢复函数，调用之后精灵回到保存时的状态
+    """
+    state = [(sprite, sprite.rect.copy(), getattr(sprite, "hp", None), sprite.groups())
+             for sprite in game.all_group]
+    pool = game.hero.bullet_pool
+
+    def restore():
+        for sprite, rect, hp, groups in state:
+            sprite.rect = rect.copy()
+
+            if hp is not None:
+                sprite.hp = hp
+
+            # 被移除的子弹重新加入精灵组，同时从对象池的空闲列表中取出
+            if not sprite.alive():
+                if sprite in pool.free_bullets:
+                    pool.free_bullets.remove(sprite)
+
+                sprite.add(*groups)
+
+    return restore
+
+
+def bench_collide(level, is_stress=False):
+    """碰撞检测，每轮之前恢复精灵状态
+
+    :param level: 游戏级别
+    :param is_stress: 是否添加额外的敌机和子弹
+    :return: 创建测试函数的函数
+    """
+
+    def setup():
+        game = create_game(level)
+
+        if is_stress:
+            add_stress(game)
+
+        return game.check_collide, snapshot(game)
+
+    return setup
+
+
+def bench_update():
+    """更新全部精灵，与游戏中一样每隔 FRAME_INTERVAL 次更新动画
+
+    :return: (测试函数, 每轮之前调用的函数)
+    """
+    game = create_game(3)
+    counter = [0]
+
+    def run():
+        counter[0] = (counter[0] + 1) % FRAME_INTERVAL
+        game.all_group.update(counter[0] == 0, 0, 0)
+
+    return run, snapshot(game)
+
+
+def bench_draw():
+    """按层绘制背景和全部精灵
+
+    :return: (测试函数, 每轮之前调用的函数)
+    """
+    game = create_game(3)
+
+    return lambda: game.renderer.draw(game.sprite_layers()), None
+
+
+def bench_fire():
+    """英雄发射子弹，每轮之前清空子弹，归还到对象池
+
+    :return: (测试函数, 每轮之前调用的函数)
+    """
+    game = create_game(1, 0)
+    hero = game.hero
+
+    def reset():
+        for bullet in hero.bullets_group:
+            bullet.kill()
+
+    return lambda: hero.fire(game.all_group), reset
+
+
+def bench_blowup():
+    """引爆炸弹，每轮之前恢复敌机的生命值
+
+    :return: (测试函数, 每轮之前调用的函数)
+    """
+    game = create_game(3)
+    hero = game.hero
+    restore = snapshot(game)
+
+    def reset():
+        restore()
+        hero.bomb_count = HERO_BOMB_COUNT
+
+    return lambda: hero.blowup(game.enemies_group), reset
+
+
+def bench_increase_score():
+    """增加得分，并重新生成得分标签的图像
+
+    :return: (测试函数, 每轮之前调用的函数)
+    """
+    game = create_game(1, 0)
+    hud_panel = game.hud_panel
+
+    def run():
+        hud_panel.increase_score(1000)
+        hud_panel.score_label.image
+
+    return run, None
+
+
+def bench_music_player():
+    """创建音乐播放器，每轮之前等待上一个播放器的后台线程结束
+
+    :return: (测试函数, 每轮之前调用的函数)
+    """
+    players = []
+
+    def run():
+        players.append(MusicPlayer("game_music.ogg", sound_names=GAME_SOUNDS))
+
+    def reset():
+        while players:
+            players.pop().close()
+
+    return run, reset
+
+
+# 基准测试，每一项是 (名称, 创建测试函数的函数, 每轮调用次数, 轮数)
+BENCHMARKS = (
+    ("check_collide_level1", bench_collide(1), 1, 500),
+    ("check_collide_level2", bench_collide(2), 1, 500),
+    ("check_collide_level3", bench_collide(3), 1, 500),
+    ("check_collide_stress", bench_collide(3, True), 1, 100),
+    ("all_group_update", bench_update, 10, 200),
+    ("all_group_draw", bench_draw, 10, 200),
+    ("hero_fire", bench_fire, 20, 500),
+    ("hero_blowup", bench_blowup, 1, 500),
+    ("hud_increase_score", bench_increase_score, 100, 100),
+    ("music_player_init", bench_music_player, 1, 10),
+)
+
+
+def run_benchmark(setup, number, rounds):
+    """运行 1 项测试，计时期间关闭垃圾回收
+
+    :param setup: 创建测试函数的函数，返回 (测试函数, 每轮之前调用的函数)
+    :param number: 每轮调用次数
+    :param rounds: 轮数
+    :return: 结果字典，耗时是每次调用的微秒数
+    """
+    run, reset = setup()
+    times = []
+
+    # 先运行 1 轮，排除第一次调用时的缓存和加载
+    for i in range(rounds + 1):
+        if reset is not None:
+            reset()
+
+        gc.disable()
+        start = time.perf_counter()
+
+        for j in range(number):
+            run()
+
+        elapsed = time.perf_counter() - start
+        gc.enable()
+
+        times.append(elapsed * 1e6 / number)
+
+    # 释放测试占用的资源，例如等待音乐播放器的后台线程
+    if reset is not None:
+        reset()
+
+    times = times[1:]
+
+    return {"number": number,
+            "rounds": rounds,
+            "min_us": min(times),
+            "median_us": statistics.median(times),
+            "mean_us": statistics.mean(times),
+            "max_us": max(times)}
+
+
+def run_benchmarks(names=None):
+    """运行基准测试
+
+    :param names: 名称中包含的字符串列表，不传则运行全部测试
+    :return: 包含运行环境和各项结果的字典
+    """
+    init_headless()
+
+    results = {}
+
+    for name, setup, number, rounds in BENCHMARKS:
+        if names and not any(part in name for part in names):
+            continue
+
+        # 游戏中的提示信息没有意义，丢弃
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[name] = run_benchmark(setup, number, rounds)
+
+        print("%-24s %10.1f us" % (name, results[name]["median_us"]))
+
+    return {"meta": {"seed": BENCH_SEED,
+                     "python": platform.python_version(),
+                     "pygame": pygame.version.ver,
+                     "platform": platform.platform()},
+            "results": results}
+
+
+def compare(report, baseline, threshold):
+    """按照中位数与基准结果比较
+
+    :param report: 本次结果
+    :param baseline: 基准结果
+    :param threshold: 允许增加的耗时比例，例如 0.1 表示 10%
+    :return: 耗时增加超过阈值的测试名称列表
+    """
+    regressions = []
+
+    print("%-24s %12s %12s %8s" % ("benchmark", "baseline", "current", "ratio"))
+
+    for name, result in report["results"].items():
+        base = baseline["results"].get(name)
+
+        if base is None:
+            print("%-24s %12s %12.1f %8s" % (name, "-", result["median_us"], "new"))
+            continue
+
+        ratio = result["median_us"] / base["median_us"]
+        is_regression = ratio > 1 + threshold
+
+        if is_regression:
+            regressions.append(name)
+
+        print("%-24s %12.1f %12.1f %7.2fx%s" % (name, base["median_us"], result["median_us"],
+                                                ratio, " !" if is_regression else ""))
+
+    return regressions
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="飞机大战微基准测试")
+    parser.add_argument("--only", action="append",
+                        help="只运行名称包含该字符串的测试，可以指定多次")
+    parser.add_argument("--output", default="bench_results.json",
+                        help="结果 JSON 文件名")
+    parser.add_argument("--baseline", default=None,
+                        help="基准结果 JSON 文件名，指定时比较中位数")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="允许增加的耗时比例，超过时以非 0 状态退出")
+    options = parser.parse_args()
+
+    report = run_benchmarks(options.only)
+
+    with open(options.output, "w") as file:
+        json.dump(report, file, indent=2)
+
+    print("结果已保存到 %s" % options.output)
+
+    if options.baseline is not None:
+        with open(options.baseline) as file:
+            baseline = json.load(file)
+
+        regressions = compare(report, baseline, options.threshold)
+
+        if regressions:
+            print("耗时增加超过 %d%%: %s" % (options.threshold * 100, ", ".join(regressions)))
+            sys.exit(1)
+
+    pygame.quit()
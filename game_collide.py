@@ -0,0 +1,336 @@
+import collections
+
+import pygame
+
+
+def collide_rect(sprite):
+    """计算精灵参与遮罩碰撞检测的矩形区域
+
+    遮罩碰撞只比较遮罩范围内的像素，遮罩固定在 rect 左上角，
+    所以使用遮罩尺寸而不是 rect 尺寸，保证宽相位不会漏掉碰撞
+
+    :param sprite: 精灵
+    :return: 矩形区域
+    """
+    mask = getattr(sprite, "mask", None)
+    size = mask.get_size() if mask is not None else sprite.image.get_size()
+
+    return pygame.Rect(sprite.rect.topleft, size)
+
+
+class Narrowphase(object):
+    """分级窄相位碰撞检测类
+
+    可以代替 pygame.sprite.collide_mask 作为 collided 回调函数，结果完全相同，
+    按照代价从低到高依次检测，前一级能够确定结果时不再执行后面的检测：
+
+    1. 遮罩矩形不相交，一定没有碰撞
+    2. 一方是子弹这样的小遮罩时，使用卷积预先计算全部相对位置的碰撞结果，
+       每次检测只需要读取 1 个位
+    3. 其他情况执行遮罩重叠检测，结果按照遮罩对象和相对位置缓存，缓存数量有上限
+    """
+
+    table_limit = 256  # 较小的遮罩不超过该面积时，预先计算全部相对位置的碰撞结果
+    cache_size = 4096  # 遮罩重叠结果缓存的最大数量
+
+    def __init__(self):
+        """初始化方法"""
+
+        # 遮罩对字典，key 是 (遮罩 a, 遮罩 b)，value 是 (a 宽, a 高, b 宽, b 高, 碰撞结果表)，
+        # 不需要碰撞结果表时为 None
+        self.pairs = {}
+        self.cache = collections.OrderedDict()  # 遮罩重叠结果缓存，key 是 (遮罩 a, 遮罩 b, 相对位置)
+
+        # 检测统计
+        self.rect_count = 0  # 遮罩矩形不相交的次数
+        self.table_count = 0  # 使用碰撞结果表的次数
+        self.hits = 0  # 遮罩重叠结果缓存命中次数
+        self.misses = 0  # 执行遮罩重叠检测的次数
+
+    def add_pair(self, left_mask, right_mask):
+        """记录遮罩对的尺寸，小遮罩同时计算碰撞结果表
+
+        :param left_mask: 遮罩 a
+        :param right_mask: 遮罩 b
+        :return: (a 宽, a 高, b 宽, b 高, 碰撞结果表)
+        """
+        left_w, left_h = left_mask.get_size()
+        right_w, right_h = right_mask.get_size()
+
+        table = None
+        if min(left_w * left_h, right_w * right_h) <= self.table_limit:
+            # 卷积结果中 (x, y) 位表示遮罩 b 的右下角位于 (x, y) 时是否重叠
+            table = left_mask.convolve(right_mask)
+
+        pair = (left_w, left_h, right_w, right_h, table)
+        self.pairs[(left_mask, right_mask)] = pair
+
+        return pair
+
+    def __call__(self, left, right):
+        """判断两个精灵是否碰撞
+
+        :param left: 精灵 a
+        :param right: 精灵 b
+        :return: 发生碰撞返回 True，否则返回 False
+        """
+        try:
+            left_mask = left.mask
+            right_mask = right.mask
+        except AttributeError:
+            # 没有遮罩的精灵交给 pygame 处理
+            return pygame.sprite.collide_mask(left, right) is not None
+
+        pair = self.pairs.get((left_mask, right_mask))
+        if pair is None:
+            pair = self.add_pair(left_mask, right_mask)
+
+        left_w, left_h, right_w, right_h, table = pair
+
+        # 1. 遮罩固定在 rect 左上角，比较遮罩范围的矩形
+        left_x, left_y = left.rect.topleft
+        right_x, right_y = right.rect.topleft
+        dx = right_x - left_x
+        dy = right_y - left_y
+
+        if dx >= left_w or dy >= left_h or dx <= -right_w or dy <= -right_h:
+            self.rect_count += 1
+
+            return False
+
+        # 2. 小遮罩使用碰撞结果表
+        if table is not None:
+            self.table_count += 1
+
+            return table.get_at((dx + right_w - 1, dy + right_h - 1)) == 1
+
+        # 3. 遮罩重叠检测，使用最近最少使用的缓存
+        key = (left_mask, right_mask, dx, dy)
+        result = self.cache.get(key)
+
+        if result is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+
+            return result
+
+        self.misses += 1
+
+        result = left_mask.overlap(right_mask, (dx, dy)) is not None
+
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+        return result
+
+    def stats(self):
+        """检测统计
+
+        :return: 包含各级检测次数及避免的遮罩重叠检测次数的字典
+        """
+        return {"rect": self.rect_count,
+                "table": self.table_count,
+                "hits": self.hits,
+                "misses": self.misses,
+                "avoided": self.rect_count + self.table_count + self.hits}
+
+
+class SpatialHash(object):
+    """均匀网格空间哈希类"""
+
+    def __init__(self, cell_size):
+        """初始化方法
+
+        :param cell_size: 网格单元的边长
+        """
+        self.cell_size = cell_size
+
+        self.cells = {}  # 网格单元字典，key 是单元坐标，value 是精灵列表
+        self.order = {}  # 精灵在精灵组中的顺序
+
+    def cell_keys(self, rect):
+        """计算矩形区域覆盖的网格单元坐标列表
+
+        :param rect: 矩形区域
+        :return: 网格单元坐标列表
+        """
+        size = self.cell_size
+
+        return [(x, y)
+                for x in range(rect.left // size, (rect.right - 1) // size + 1)
+                for y in range(rect.top // size, (rect.bottom - 1) // size + 1)]
+
+    def build(self, sprites):
+        """使用精灵当前的位置重建网格
+
+        :param sprites: 精灵组或精灵列表
+        """
+        self.cells.clear()
+        self.order.clear()
+
+        for index, sprite in enumerate(sprites):
+            self.order[sprite] = index
+
+            for key in self.cell_keys(collide_rect(sprite)):
+                cell = self.cells.get(key)
+
+                if cell is None:
+                    self.cells[key] = [sprite]
+                else:
+                    cell.append(sprite)
+
+    def query(self, sprite):
+        """查询与精灵处于相同网格单元的精灵
+
+        :param sprite: 要查询的精灵
+        :return: 候选精灵列表，按照精灵在精灵组中的顺序排列
+        """
+        candidates = set()
+
+        for key in self.cell_keys(collide_rect(sprite)):
+            cell = self.cells.get(key)
+
+            if cell is not None:
+                candidates.update(cell)
+
+        return sorted(candidates, key=self.order.__getitem__)
+
+
+class BruteCollider(object):
+    """逐对碰撞检测器，直接使用 pygame.sprite 的碰撞检测函数"""
+
+    def __init__(self, collided=pygame.sprite.collide_mask, cull_rect=None):
+        """初始化方法
+
+        :param collided: 判断两个精灵是否碰撞的回调函数
+        :param cull_rect: 剔除区域，与该区域不相交的精灵不参与检测，不传则不剔除
+        """
+        self.collided = collided
+        self.cull_rect = cull_rect
+
+        # 剔除统计
+        self.culled_count = 0  # 累计剔除的精灵数量
+
+    def cull(self, group):
+        """剔除与剔除区域不相交的精灵
+
+        :param group: 精灵组
+        :return: 参与检测的精灵列表，保持精灵组中的顺序
+        """
+        sprites = group.sprites()
+
+        if self.cull_rect is None:
+            return sprites
+
+        cull_rect = self.cull_rect
+        visible_sprites = [sprite for sprite in sprites
+                           if cull_rect.colliderect(sprite.rect)]
+
+        self.culled_count += len(sprites) - len(visible_sprites)
+
+        return visible_sprites
+
+    def spritecollide(self, sprite, group):
+        """检测精灵与精灵组的碰撞
+
+        :param sprite: 精灵
+        :param group: 精灵组
+        :return: 发生碰撞的精灵列表
+        """
+        return pygame.sprite.spritecollide(sprite, self.cull(group), False,
+                                           self.collided)
+
+    def groupcollide(self, group_a, group_b):
+        """检测两个精灵组之间的碰撞
+
+        :param group_a: 精灵组 a
+        :param group_b: 精灵组 b
+        :return: 字典，key 是精灵组 a 中发生碰撞的精灵，value 是与其碰撞的精灵组 b 中的精灵列表
+        """
+        sprites_b = self.cull(group_b)
+
+        crashed = {}
+        for sprite in self.cull(group_a):
+            collided_sprites = pygame.sprite.spritecollide(sprite, sprites_b, False,
+                                                           self.collided)
+
+            if collided_sprites:
+                crashed[sprite] = collided_sprites
+
+        return crashed
+
+    def stats(self):
+        """碰撞检测统计
+
+        :return: 包含剔除数量及窄相位检测统计的字典
+        """
+        stats = getattr(self.collided, "stats", None)
+
+        stats = stats() if stats is not None else {}
+        stats["culled"] = self.culled_count
+
+        return stats
+
+
+class HashCollider(BruteCollider):
+    """空间哈希碰撞检测器
+
+    每次检测时使用精灵组 b 重建空间哈希，只有处于相同网格单元的精灵对
+    才继续执行 collided 检测，返回结果及顺序与 BruteCollider 完全相同
+    """
+
+    cell_size = 64  # 网格单元的边长
+
+    def __init__(self, collided=pygame.sprite.collide_mask, cull_rect=None):
+
+        super().__init__(collided, cull_rect)
+
+        self.spatial_hash = SpatialHash(self.cell_size)
+
+        # 宽相位统计
+        self.candidate_count = 0  # 进入 collided 检测的精灵对数量
+
+    def spritecollide(self, sprite, group):
+
+        self.spatial_hash.build(self.cull(group))
+
+        return self.collide_candidates(sprite)
+
+    def groupcollide(self, group_a, group_b):
+
+        self.spatial_hash.build(self.cull(group_b))
+
+        crashed = {}
+        for sprite in self.cull(group_a):
+            collided_sprites = self.collide_candidates(sprite)
+
+            if collided_sprites:
+                crashed[sprite] = collided_sprites
+
+        return crashed
+
+    def collide_candidates(self, sprite):
+        """对空间哈希中的候选精灵执行 collided 检测
+
+        :param sprite: 精灵
+        :return: 发生碰撞的精灵列表
+        """
+        candidates = self.spatial_hash.query(sprite)
+        self.candidate_count += len(candidates)
+
+        return [other for other in candidates if self.collided(sprite, other)]
+
+    def stats(self):
+
+        stats = super().stats()
+        stats["candidates"] = self.candidate_count
+
+        return stats
+
+
+# 碰撞检测模式名称对应的检测器类
+COLLIDERS = {"brute": BruteCollider, "hash": HashCollider}
+
+# 窄相位模式名称对应的 collided 回调函数工厂
+NARROWPHASES = {"mask": lambda: pygame.sprite.collide_mask, "tiered": Narrowphase}
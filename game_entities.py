@@ -0,0 +1,345 @@
+from game_items import *
+
+# NumPy 是可选依赖，只有使用 numpy 实体后端时才需要
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def store_field(name):
+    """创建读写实体存储数组的属性，精灵通过该属性访问自己在数组中的数据
+
+    :param name: 数组属性名
+    :return: 属性对象
+    """
+
+    def getter(self):
+        return getattr(self.store, name)[self.index].item()
+
+    def setter(self, value):
+        getattr(self.store, name)[self.index] = value
+
+    return property(getter, setter)
+
+
+class EntityStore(object):
+    """实体存储类
+
+    使用 NumPy 数组按列保存实体的位置、速度、生命值和类型，
+    每帧使用向量运算移动全部实体，精灵只保留绘制和碰撞检测需要的 rect
+    """
+
+    # 数组属性名，扩展容量时依次扩展
+    fields = ("active", "x", "y", "w", "h", "speed", "max_speed", "hp", "max_hp", "kind")
+
+    def __init__(self, capacity=64):
+        """初始化方法
+
+        :param capacity: 初始容量，容量不足时自动扩展
+        """
+        if numpy is None:
+            raise RuntimeError("numpy 实体后端需要安装 numpy，运行 poetry install -E numpy")
+
+        self.sprites = [None] * capacity  # 数组下标对应的精灵
+        self.free_indexes = list(range(capacity - 1, -1, -1))  # 空闲下标列表
+
+        self.active = numpy.zeros(capacity, dtype=bool)  # 是否参与运动
+        self.x = numpy.zeros(capacity)  # 水平位置
+        self.y = numpy.zeros(capacity)  # 垂直位置，保留不足 1 像素的部分
+        self.w = numpy.zeros(capacity, dtype=numpy.int32)  # 宽度
+        self.h = numpy.zeros(capacity, dtype=numpy.int32)  # 高度
+        self.speed = numpy.zeros(capacity)  # 垂直速度，单位像素/秒
+        self.max_speed = numpy.zeros(capacity)  # 最大速度，单位像素/秒
+        self.hp = numpy.zeros(capacity, dtype=numpy.int32)  # 生命值
+        self.max_hp = numpy.zeros(capacity, dtype=numpy.int32)  # 最大生命值
+        self.kind = numpy.zeros(capacity, dtype=numpy.int8)  # 类型
+
+    @property
+    def capacity(self):
+        """存储容量"""
+        return len(self.sprites)
+
+    def allocate(self, sprite):
+        """为精灵分配数组下标
+
+        :param sprite: 精灵
+        :return: 数组下标
+        """
+        if not self.free_indexes:
+            self.grow()
+
+        index = self.free_indexes.pop()
+        self.sprites[index] = sprite
+
+        return index
+
+    def grow(self):
+        """容量扩展为原来的 2 倍"""
+
+        capacity = self.capacity
+
+        for name in self.fields:
+            array = getattr(self, name)
+            setattr(self, name, numpy.concatenate((array, numpy.zeros_like(array))))
+
+        self.sprites += [None] * capacity
+        self.free_indexes = list(range(2 * capacity - 1, capacity - 1, -1)) + self.free_indexes
+
+    def release(self, index):
+        """释放数组下标
+
+        :param index: 数组下标
+        """
+        self.active[index] = False
+        self.sprites[index] = None
+
+        self.free_indexes.append(index)
+
+    def set_position(self, index, rect):
+        """使用精灵的 rect 设置数组中的位置和尺寸
+
+        :param index: 数组下标
+        :param rect: 精灵的矩形区域
+        """
+        self.x[index] = rect.x
+        self.y[index] = rect.y
+        self.w[index] = rect.w
+        self.h[index] = rect.h
+
+    def sync_rects(self, indexes):
+        """将数组中的位置写回精灵的 rect
+
+        :param indexes: 要写回的数组下标数组
+        """
+        sprites = self.sprites
+        xs = self.x[indexes].astype(numpy.int32).tolist()
+        ys = numpy.floor(self.y[indexes]).astype(numpy.int32).tolist()
+
+        for index, x, y in zip(indexes.tolist(), xs, ys):
+            sprites[index].rect.topleft = (x, y)
+
+    def update(self, is_animate):
+        """使用向量运算移动全部活动的实体，并写回精灵的 rect
+
+        :param is_animate: 是否需要更新动画图像
+        """
+        self.move(self.active)
+
+    def move(self, mask):
+        """使用向量运算移动指定的实体，并写回精灵的 rect，被摧毁的实体不移动
+
+        :param mask: 要移动的实体的布尔数组
+        """
+        moving = mask & (self.hp > 0)
+        self.y[moving] += self.speed[moving] * SIM_STEP
+
+        self.sync_rects(numpy.flatnonzero(moving))
+
+
+class EnemyStore(EntityStore):
+    """敌机存储类，飞出屏幕的敌机使用向量运算批量重置
+
+    与 Enemy 相同，在窗口上方等待的敌机直接移动到进入窗口之前的位置并进入休眠，
+    休眠期间只批量倒数，不更新图像和位置
+    """
+
+    fields = EntityStore.fields + ("dormant",)
+
+    def __init__(self, rng, capacity=64):
+        """初始化方法
+
+        :param rng: 随机数生成器，用于生成 NumPy 随机数生成器的种子
+        :param capacity: 初始容量
+        """
+        super().__init__(capacity)
+
+        self.rng = rng
+        self.np_rng = numpy.random.default_rng(rng.getrandbits(64))
+
+        self.dormant = numpy.zeros(self.capacity, dtype=numpy.int32)  # 休眠剩余的步数
+
+    def create_enemy(self, kind, max_speed, *groups, rng=None, is_reserve=False):
+        """创建使用当前存储的敌机，参数与 Enemy 相同
+
+        :return: 敌机精灵
+        """
+        return EnemyView(self, kind, max_speed, *groups, rng=rng or self.rng,
+                         is_reserve=is_reserve)
+
+    def respawn(self, indexes):
+        """在游戏窗口上方随机位置重置敌机
+
+        :param indexes: 要重置的数组下标数组
+        """
+        count = len(indexes)
+        if count == 0:
+            return
+
+        np_rng = self.np_rng
+        w = self.w[indexes]
+        h = self.h[indexes]
+
+        # integers 的上限不包含在范围内，与 randint 保持一致需要 + 1
+        self.x[indexes] = np_rng.integers(0, SCREEN_RECT.w - w + 1)
+        self.y[indexes] = np_rng.integers(0, SCREEN_RECT.h - h + 1) - SCREEN_RECT.h
+        self.speed[indexes] = np_rng.integers(ENEMY_MIN_SPEED, self.max_speed[indexes] + 1)
+        self.hp[indexes] = self.max_hp[indexes]
+
+        # 进入休眠，直接移动到进入窗口之前的位置，休眠期间只倒数移动所需的步数
+        step_distance = self.speed[indexes] * SIM_STEP
+        dormant = numpy.floor(-(self.y[indexes] + h) / step_distance).astype(numpy.int32)
+        self.dormant[indexes] = numpy.maximum(dormant, 0)
+        self.y[indexes] += self.dormant[indexes] * step_distance
+
+        self.sync_rects(indexes)
+
+    def update(self, is_animate):
+
+        # 休眠的敌机只倒数，倒数到 0 的下一步开始运动
+        sleeping = self.active & (self.dormant > 0)
+        self.dormant[sleeping] -= 1
+        awake = self.active & ~sleeping
+
+        # 批量更新动画图像，避免每帧为每架敌机调用 update
+        if is_animate:
+            for index in numpy.flatnonzero(awake).tolist():
+                Plane.update(self.sprites[index], True)
+
+        self.move(awake)
+
+        # 飞出屏幕的敌机，重置图像及位置
+        indexes = numpy.flatnonzero(awake & (self.y >= SCREEN_RECT.h))
+
+        for index in indexes.tolist():
+            Plane.reset_plane(self.sprites[index])
+
+        self.respawn(indexes)
+
+
+class BulletStore(EntityStore):
+    """子弹存储类，飞出屏幕的子弹使用向量运算批量筛选"""
+
+    def create_bullet(self, kind, *groups):
+        """创建使用当前存储的子弹，参数与 Bullet 相同
+
+        :return: 子弹精灵
+        """
+        return BulletView(self, kind, *groups)
+
+    def update(self, is_animate):
+
+        super().update(is_animate)
+
+        # 从上方飞出窗口的子弹
+        indexes = numpy.flatnonzero(self.active & (self.y + self.h < 0))
+
+        for index in indexes.tolist():
+            self.sprites[index].kill()
+
+
+class EnemyView(Enemy):
+    """敌机视图类，运动数据保存在 EnemyStore 中，精灵只负责动画和绘制"""
+
+    hp = store_field("hp")
+    max_hp = store_field("max_hp")
+    speed = store_field("speed")
+    max_speed = store_field("max_speed")
+    dormant_steps = store_field("dormant")
+
+    def __init__(self, store, kind, max_speed, *groups, rng=random, is_reserve=False):
+        """初始化方法
+
+        :param store: 敌机存储
+        :param kind: 敌机类型
+        :param max_speed: 最大速度，单位像素/秒
+        :param groups: 要添加到的精灵组
+        :param rng: 随机数生成器
+        :param is_reserve: 是否创建为预备敌机
+        """
+        # 父类初始化方法会设置存储在数组中的属性，需要先分配下标
+        self.store = store
+        self.index = store.allocate(self)
+        store.kind[self.index] = kind
+
+        super().__init__(kind, max_speed, *groups, rng=rng, is_reserve=is_reserve)
+
+        store.active[self.index] = not is_reserve
+
+    def activate(self, max_speed, *groups):
+
+        self.store.active[self.index] = True
+
+        super().activate(max_speed, *groups)
+
+    def deactivate(self):
+
+        # 停用的敌机保留存储中的下标，再次启用时继续使用
+        super().deactivate()
+
+        self.store.active[self.index] = False
+
+    def reset_plane(self):
+        """重置飞机，位置和速度由存储批量生成"""
+
+        Plane.reset_plane(self)
+
+        self.store.set_position(self.index, self.rect)
+        self.store.respawn(numpy.array([self.index]))
+
+    def update(self, *args):
+        """图像和位置都由存储更新"""
+        pass
+
+    def kill(self):
+
+        super().kill()
+
+        # 移除的敌机释放存储中的下标
+        if self.index is not None:
+            self.store.release(self.index)
+            self.index = None
+
+
+class BulletView(Bullet):
+    """子弹视图类，运动数据保存在 BulletStore 中，精灵只负责绘制"""
+
+    speed = store_field("speed")
+
+    def __init__(self, store, kind, *groups):
+        """初始化方法
+
+        :param store: 子弹存储
+        :param kind: 子弹类型
+        :param groups: 要添加到的精灵组
+        """
+        self.store = store
+        self.index = store.allocate(self)
+        store.kind[self.index] = kind
+        store.hp[self.index] = 1  # 子弹一直处于运动状态
+
+        super().__init__(kind, *groups)
+
+    def set_kind(self, kind):
+
+        super().set_kind(kind)
+
+        self.store.kind[self.index] = kind
+
+    def place(self, midbottom):
+
+        super().place(midbottom)
+
+        self.store.set_position(self.index, self.rect)
+        self.store.active[self.index] = True
+
+    def update(self, *args):
+        """位置由存储更新"""
+        pass
+
+    def kill(self):
+
+        # 子弹对象池会重复使用子弹，只停止运动，不释放下标
+        self.store.active[self.index] = False
+
+        super().kill()
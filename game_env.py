@@ -0,0 +1,309 @@
+"""强化学习环境
+
+将无头游戏包装为 reset / step 接口，按照动作直接推进模拟步，不需要模拟按键事件，
+奖励是得分的增量，生命计数为 0 时结束。观察可以是游戏画面的 NumPy 视图，
+也可以是精灵位置组成的状态向量。VectorEnv 同时推进多局游戏
+
+    python game_env.py --envs 8 --steps 2000                 测试状态向量观察的每秒步数
+    python game_env.py --envs 8 --steps 2000 --obs pixels    测试画面观察的每秒步数
+"""
+import contextlib
+import io
+import time
+
+from game import *
+
+# NumPy 是可选依赖，只有使用环境时才需要
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# 动作表，每一项是 (水平移动基数, 垂直移动基数, 是否引爆炸弹)，动作是表中的下标
+ACTIONS = [(move_hor, move_ver, is_bomb)
+           for is_bomb in (False, True)
+           for move_ver in (-1, 0, 1)
+           for move_hor in (-1, 0, 1)]
+
+STATE_ENEMIES = 40  # 状态向量中敌机的最大数量，超出的敌机被忽略
+STATE_SUPPLIES = 2  # 状态向量中道具的数量
+# 状态向量长度：英雄 6 项，每架敌机 4 项，每个道具 3 项
+STATE_SIZE = 6 + STATE_ENEMIES * 4 + STATE_SUPPLIES * 3
+
+
+class GameEnv(object):
+    """游戏环境类"""
+
+    max_surfaces = 4  # 画面观察最多使用的表面数量
+
+    def __init__(self, observation="state", frame_skip=1, max_steps=None,
+                 entity_backend="sprite"):
+        """初始化方法
+
+        :param observation: 观察类型，state 状态向量，pixels 游戏画面
+        :param frame_skip: 每个动作重复的模拟步数
+        :param max_steps: 每局最多的动作次数，达到时结束并在 info 中标记截断，不传则不限制
+        :param entity_backend: 游戏的实体后端
+        """
+        if numpy is None:
+            raise RuntimeError("游戏环境需要安装 numpy，运行 poetry install -E numpy")
+
+        self.observation = observation
+        self.frame_skip = frame_skip
+        self.max_steps = max_steps
+        self.entity_backend = entity_backend
+
+        self.game = None  # 当前游戏
+        self.action = ACTIONS[0]  # 当前动作
+        self.step_count = 0  # 本局的动作次数
+        self.pixels = None  # 画面观察，锁定游戏表面的 NumPy 视图
+        self.surfaces = []  # 画面观察轮流使用的表面
+
+        init_headless()
+
+    def poll(self, game):
+        """游戏的输入源，返回当前动作
+
+        :param game: 游戏对象
+        :return: (水平移动基数, 垂直移动基数, 本帧按下的按键列表)
+        """
+        move_hor, move_ver, is_bomb = self.action
+
+        return move_hor, move_ver, (pygame.K_b,) if is_bomb else ()
+
+    def reset(self, seed=None):
+        """开始新的一局
+
+        :param seed: 随机数种子
+        :return: 观察
+        """
+        self.pixels = None
+
+        # 游戏中的提示信息没有意义，丢弃
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.game = Game(headless=True, seed=seed,
+                             input_source=ScriptedInput(self.poll),
+                             entity_backend=self.entity_backend,
+                             is_render=self.observation == "pixels")
+
+        self.action = ACTIONS[0]
+        self.step_count = 0
+
+        return self.observe()
+
+    def step(self, action):
+        """执行动作
+
+        :param action: 动作表中的下标
+        :return: (观察, 奖励, 是否结束, 信息字典)
+        """
+        game = self.game
+        self.action = ACTIONS[action]
+        score = game.hud_panel.score
+
+        self.pixels = None
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(self.frame_skip):
+                game.step()
+
+                # 炸弹只引爆 1 次
+                self.action = self.action[:2] + (False,)
+
+                if game.hud_panel.lives_count == 0:
+                    break
+
+        self.step_count += 1
+
+        is_truncated = self.max_steps is not None and self.step_count >= self.max_steps
+        done = game.hud_panel.lives_count == 0 or is_truncated
+
+        info = {"score": game.hud_panel.score,
+                "level": game.hud_panel.level,
+                "lives": game.hud_panel.lives_count,
+                "frames": game.frame_count,
+                "truncated": is_truncated}
+
+        return self.observe(), game.hud_panel.score - score, done, info
+
+    def observe(self):
+        """生成观察
+
+        :return: 画面观察是 (宽, 高, 3) 的 uint8 数组，状态观察是 float32 向量
+        """
+        if self.observation == "pixels":
+            surface = self.unlocked_surface()
+
+            self.game.main_window = surface
+            self.game.renderer.surface = surface
+            self.game.render(1.0)
+
+            # 视图直接引用表面的像素，没有复制，但是在视图释放之前表面一直被锁定
+            self.pixels = pygame.surfarray.pixels3d(surface)
+
+            return self.pixels
+
+        return self.state()
+
+    def unlocked_surface(self):
+        """查找没有被画面观察锁定的表面
+
+        调用方通常会在下一步返回之前一直引用上一步的观察，
+        所以轮流使用多个表面，每次都完整绘制，不需要复制像素
+
+        :return: 可以绘制的表面
+        """
+        if not self.surfaces:
+            self.surfaces.append(self.game.main_window)
+
+        for surface in self.surfaces:
+            if not surface.get_locked():
+                return surface
+
+        if len(self.surfaces) >= self.max_surfaces:
+            raise RuntimeError("引用的画面观察过多，需要保留观察时请复制")
+
+        surface = self.surfaces[0].copy()
+        self.surfaces.append(surface)
+
+        return surface
+
+    def state(self):
+        """生成状态向量，位置按照窗口尺寸归一化
+
+        :return: 长度为 STATE_SIZE 的 float32 向量
+        """
+        game = self.game
+        hero = game.hero
+        width = SCREEN_RECT.w
+        height = SCREEN_RECT.h
+
+        values = [hero.rect.centerx / width, hero.rect.centery / height,
+                  float(hero.is_power), hero.bomb_count, hero.bullets_kind,
+                  game.hud_panel.lives_count]
+
+        # 敌机：位置、类型、剩余生命值比例，窗口外的敌机不包含在内
+        enemies = [enemy for enemy in game.enemies_group
+                   if enemy.hp > 0 and enemy.rect.colliderect(SCREEN_RECT)]
+
+        for enemy in enemies[:STATE_ENEMIES]:
+            values += (enemy.rect.centerx / width, enemy.rect.centery / height,
+                       enemy.kind, enemy.hp / enemy.max_hp)
+
+        values += [0.0] * (4 * (STATE_ENEMIES - min(len(enemies), STATE_ENEMIES)))
+
+        # 道具：位置、是否在窗口内
+        for supply in game.supplies_group.sprites()[:STATE_SUPPLIES]:
+            values += (supply.rect.centerx / width, supply.rect.centery / height,
+                       float(supply.rect.colliderect(SCREEN_RECT)))
+
+        return numpy.array(values, dtype=numpy.float32)
+
+
+class VectorEnv(object):
+    """批量游戏环境类
+
+    同时推进多局游戏，结束的游戏自动开始新的一局。状态观察按照第 0 维堆叠为数组，
+    画面观察不复制像素，返回每局游戏的画面视图组成的列表
+    """
+
+    def __init__(self, count, **kwargs):
+        """初始化方法
+
+        :param count: 游戏数量
+        :param kwargs: 传递给 GameEnv 的参数
+        """
+        self.envs = [GameEnv(**kwargs) for i in range(count)]
+        self.seeds = [None] * count  # 每局游戏下一次使用的随机数种子
+
+        # 观察缓冲区，状态观察是数组，画面观察是视图列表
+        if kwargs.get("observation") == "pixels":
+            self.observations = [None] * count
+        else:
+            self.observations = numpy.zeros((count, STATE_SIZE), dtype=numpy.float32)
+
+    def collect(self, index, observation):
+        """将观察保存到缓冲区
+
+        :param index: 游戏下标
+        :param observation: 观察
+        """
+        self.observations[index] = observation
+
+    def reset(self, seed=None):
+        """开始全部游戏
+
+        :param seed: 第 1 局游戏的随机数种子，其他游戏依次加 1，不传则使用系统随机源
+        :return: 观察数组
+        """
+        for index, env in enumerate(self.envs):
+            self.seeds[index] = None if seed is None else seed + index
+
+            self.collect(index, env.reset(self.seeds[index]))
+
+        return self.observations
+
+    def step(self, actions):
+        """每局游戏执行 1 个动作
+
+        :param actions: 动作下标序列，长度与游戏数量相同
+        :return: (观察数组, 奖励数组, 结束标记数组, 信息字典列表)，
+                 结束的游戏已经开始新的一局，观察是新一局的第 1 个观察
+        """
+        count = len(self.envs)
+        rewards = numpy.zeros(count, dtype=numpy.float32)
+        dones = numpy.zeros(count, dtype=bool)
+        infos = []
+
+        for index, (env, action) in enumerate(zip(self.envs, actions)):
+            observation, rewards[index], dones[index], info = env.step(action)
+
+            if dones[index]:
+                # 每局游戏的种子序列互不重叠
+                if self.seeds[index] is not None:
+                    self.seeds[index] += count
+
+                observation = env.reset(self.seeds[index])
+
+            self.collect(index, observation)
+            infos.append(info)
+
+        return self.observations, rewards, dones, infos
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="测试飞机大战环境的每秒步数")
+    parser.add_argument("--envs", type=int, default=8, help="同时运行的游戏数量")
+    parser.add_argument("--steps", type=int, default=2000, help="批量执行的次数")
+    parser.add_argument("--obs", choices=("state", "pixels"), default="state",
+                        help="观察类型")
+    parser.add_argument("--frame-skip", type=int, default=1, help="每个动作重复的模拟步数")
+    parser.add_argument("--entities", choices=("sprite", "numpy"), default="sprite",
+                        help="敌机和子弹的运动后端")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+    options = parser.parse_args()
+
+    vector_env = VectorEnv(options.envs, observation=options.obs,
+                           frame_skip=options.frame_skip,
+                           entity_backend=options.entities)
+    vector_env.reset(options.seed)
+
+    rng = numpy.random.default_rng(options.seed)
+
+    start = time.perf_counter()
+    episodes = 0
+
+    for i in range(options.steps):
+        actions = rng.integers(0, len(ACTIONS), options.envs)
+        observations, rewards, dones, infos = vector_env.step(actions)
+
+        episodes += int(dones.sum())
+
+    elapsed = time.perf_counter() - start
+    steps = options.steps * options.envs
+
+    print("观察 %s %s，%d 个游戏共 %d 步，耗时 %.2f 秒，%.1f 步/秒，%.1f 模拟步/秒，结束 %d 局" %
+          (options.obs, numpy.shape(observations[0]), options.envs, steps, elapsed,
+           steps / elapsed, steps * options.frame_skip / elapsed, episodes))
@@ -0,0 +1,99 @@
+import heapq
+
+
+class ScheduledTask(object):
+    """计划任务类"""
+
+    def __init__(self, due, interval, callback):
+        """初始化方法
+
+        :param due: 下次执行的模拟时间，单位毫秒
+        :param interval: 重复执行的间隔毫秒数，0 表示只执行 1 次
+        :param callback: 执行时调用的函数，没有参数
+        """
+        self.due = due
+        self.interval = interval
+        self.callback = callback
+        self.is_cancelled = False  # 取消标记
+
+
+class Scheduler(object):
+    """模拟时间调度器类
+
+    使用按照执行时间排序的优先队列保存计划任务，只有调用 advance 时模拟时间才会推进，
+    暂停或游戏结束时不推进，任务就不会执行也不会堆积，相同输入总是在相同的步执行任务
+    """
+
+    def __init__(self):
+        """初始化方法"""
+
+        self.now = 0.0  # 当前模拟时间，单位毫秒
+        self.queue = []  # 优先队列，每一项是 (执行时间, 序号, 任务)
+        self.sequence = 0  # 任务序号，执行时间相同的任务按照添加顺序执行
+
+    def call_later(self, delay, callback):
+        """添加只执行 1 次的任务
+
+        :param delay: 延迟毫秒数，0 表示下次推进时执行
+        :param callback: 执行时调用的函数，没有参数
+        :return: 任务对象，可以用于取消任务
+        """
+        return self.schedule(ScheduledTask(self.now + delay, 0, callback))
+
+    def call_every(self, interval, callback):
+        """添加重复执行的任务，第一次在间隔时间之后执行
+
+        :param interval: 间隔毫秒数
+        :param callback: 执行时调用的函数，没有参数
+        :return: 任务对象，可以用于取消任务
+        """
+        return self.schedule(ScheduledTask(self.now + interval, interval, callback))
+
+    def schedule(self, task):
+        """将任务加入优先队列
+
+        :param task: 任务对象
+        :return: 任务对象
+        """
+        heapq.heappush(self.queue, (task.due, self.sequence, task))
+        self.sequence += 1
+
+        return task
+
+    @staticmethod
+    def cancel(task):
+        """取消任务，已经取消或者不存在的任务直接忽略
+
+        :param task: 任务对象，可以是 None
+        """
+        # 取消的任务留在优先队列中，出队时再丢弃
+        if task is not None:
+            task.is_cancelled = True
+
+    def advance(self, millis):
+        """推进模拟时间，并按照执行时间的顺序执行全部到期的任务
+
+        :param millis: 推进的模拟毫秒数
+        """
+        # 消除浮点数累加的误差，保证整数毫秒的任务在预期的步执行
+        self.now = round(self.now + millis, 6)
+
+        queue = self.queue
+
+        while queue and queue[0][0] <= self.now:
+            task = heapq.heappop(queue)[2]
+
+            if task.is_cancelled:
+                continue
+
+            task.callback()
+
+            # 重复执行的任务，在回调函数中没有被取消时，计划下一次执行
+            if task.interval > 0 and not task.is_cancelled:
+                task.due += task.interval
+
+                self.schedule(task)
+
+    def __len__(self):
+        """尚未执行的任务数量，包括已经取消但是还没有出队的任务"""
+        return len(self.queue)
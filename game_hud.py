@@ -12,21 +12,18 @@ class HUDPanel(object):
     level2_score = 10000  # 级别 2 分值
     level3_score = 50000  # 级别 3 分值
 
-    record_filename = "record.txt"  # 最好成绩文件名
-
-    def __init__(self, display_group):
+    def __init__(self, display_group, best_score=0):
         """初始化方法
 
         :param display_group: 面板中的精灵要被添加到的显示精灵组
+        :param best_score: 最好成绩，由成绩存储在游戏开始之前加载
         """
 
         # 1. 游戏属性
         self.score = 0  # 游戏得分
         self.lives_count = 3  # 生命计数
         self.level = 1  # 游戏级别
-        self.best_score = 0  # 最好成绩
-
-        self.load_best_score()  # 加载最好成绩
+        self.best_score = best_score  # 最好成绩
 
         # 2. 创建图像精灵
         # 1> 状态精灵
@@ -193,26 +190,3 @@ class HUDPanel(object):
                                          self.status_sprite.rect.centery)
 
         return is_upgrade
-
-    def save_best_score(self):
-        """将最好成绩写入 record.txt"""
-
-        file = open(self.record_filename, "w")
-
-        file.write("%d" % self.best_score)
-
-        file.close()
-
-    def load_best_score(self):
-        """从 record.txt 加载最好成绩"""
-
-        try:
-            file = open(self.record_filename)
-
-            txt = file.readline()
-
-            file.close()
-
-            self.best_score = int(txt)
-        except (FileNotFoundError, ValueError):
-            print("文件不存在或者类型转换错误")
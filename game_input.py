@@ -0,0 +1,46 @@
+import pygame
+
+
+class KeyboardInput(object):
+    """键盘输入源类，读取玩家的按键"""
+
+    @staticmethod
+    def poll(game):
+        """读取当前帧的输入
+
+        :param game: 游戏对象
+        :return: (水平移动基数, 垂直移动基数, 本帧按下的按键列表)
+        """
+        # 取出按键按下事件，其他事件保留在事件队列中
+        keys_down = [event.key for event in pygame.event.get(pygame.KEYDOWN)]
+
+        # 获得当前时刻的按键元组
+        keys = pygame.key.get_pressed()
+        # 水平移动基数
+        move_hor = keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]
+        # 垂直移动基数
+        move_ver = keys[pygame.K_DOWN] - keys[pygame.K_UP]
+
+        return move_hor, move_ver, keys_down
+
+
+class ScriptedInput(object):
+    """脚本输入源类，由策略函数代替玩家操作"""
+
+    def __init__(self, policy=None):
+        """初始化方法
+
+        :param policy: 策略函数，参数是游戏对象，返回值与 poll 相同，不传则保持不动
+        """
+        self.policy = policy
+
+    def poll(self, game):
+        """读取当前帧的输入
+
+        :param game: 游戏对象
+        :return: (水平移动基数, 垂直移动基数, 本帧按下的按键列表)
+        """
+        if self.policy is None:
+            return 0, 0, ()
+
+        return self.policy(game)
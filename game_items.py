@@ -1,27 +1,173 @@
 import random
 import pygame
 
+from game_assets import *
+from game_events import *
+
 # 全局常量定义
 SCREEN_RECT = pygame.Rect(0, 0, 480, 700)  # 游戏主窗口矩形区域
-FRAME_INTERVAL = 10  # 逐帧动画间隔帧数
+FRAME_INTERVAL = 10  # 逐帧动画间隔帧数，按照模拟步数计算
+SIM_RATE = 60  # 每秒模拟步数
+SIM_STEP = 1 / SIM_RATE  # 每个模拟步长的秒数
+FRAME_MILLIS = 1000 / SIM_RATE  # 每个模拟步长的毫秒数
 
 HERO_BOMB_COUNT = 3  # 英雄默认炸弹数量
+ENEMY_MIN_SPEED = 60  # 敌机最小速度，单位像素/秒
+BULLET_POOL_CAPACITY = 64  # 英雄子弹对象池默认容量
+# 背景层，每一项是 (图片文件名, 滚动速度)，速度单位像素/秒，后面的层是叠加在上方的视差层
+BACKGROUND_LAYERS = (("background.png", 60),)
 # 英雄默认初始位置
 HERO_DEFAULT_MID_BOTTOM = (SCREEN_RECT.centerx,
                            SCREEN_RECT.bottom - 90)
 
-HERO_DEAD_EVENT = pygame.USEREVENT  # 英雄牺牲事件
-HERO_POWER_OFF_EVENT = pygame.USEREVENT + 1  # 取消英雄无敌事件
-HERO_FIRE_EVENT = pygame.USEREVENT + 2  # 英雄发射子弹事件
+# 计划任务时间，按照模拟时间计算，单位毫秒
+HERO_FIRE_INTERVAL = 200  # 英雄发射子弹间隔
+HERO_POWER_TIME = 3000  # 英雄复活之后的无敌时间
+THROW_SUPPLY_INTERVAL = 10000  # 投放道具间隔
+BULLET_ENHANCED_TIME = 8000  # 子弹增强持续时间
 
-THROW_SUPPLY_EVENT = pygame.USEREVENT + 3  # 投放道具事件
-BULLET_ENHANCED_OFF_EVENT = pygame.USEREVENT + 4  # 关闭子弹增强事件
 
+class TextRenderer(object):
+    """文本渲染器类
 
-class Label(pygame.sprite.Sprite):
-    """文本标签精灵"""
+    所有标签共享相同字号的字体对象，常用字符渲染一次后缓存字形，
+    只包含常用字符的文本使用缓存的字形拼接，不需要重新渲染 TrueType 字体
+    """
 
     font_path = "./res/font/MarkerFelt.ttc"  # 字体文件路径
+    glyph_chars = "0123456789X :Best"  # 缓存字形的常用字符
+
+    def __init__(self):
+        """初始化方法"""
+
+        self.fonts = {}  # 字体字典，key 是字号
+        self.glyphs = {}  # 字形字典，key 是 (字号, 颜色, 字符)
+        self.texts = {}  # 包含其他字符的文本，key 是 (字号, 颜色, 文本)
+
+        # 渲染统计
+        self.glyph_renders = 0  # 渲染字形的次数
+        self.text_renders = 0  # 完整渲染文本的次数
+        self.composes = 0  # 使用字形拼接文本的次数
+
+    def get_font(self, size):
+        """获取指定字号的字体，每个字号只加载一次
+
+        :param size: 字体大小
+        :return: 字体对象
+        """
+        font = self.fonts.get(size)
+
+        if font is None:
+            font = pygame.font.Font(self.font_path, size)
+            self.fonts[size] = font
+
+        return font
+
+    def get_glyph(self, char, size, color):
+        """获取字符的字形图像
+
+        :param char: 字符
+        :param size: 字体大小
+        :param color: 字体颜色
+        :return: 字形图像
+        """
+        key = (size, color, char)
+        glyph = self.glyphs.get(key)
+
+        if glyph is None:
+            glyph = self.get_font(size).render(char, True, color)
+
+            # 已经创建游戏窗口时，转换为显示格式
+            if pygame.display.get_surface() is not None:
+                glyph = glyph.convert_alpha()
+
+            self.glyphs[key] = glyph
+            self.glyph_renders += 1
+
+        return glyph
+
+    def is_composable(self, text):
+        """判断文本是否只包含缓存字形的常用字符
+
+        :param text: 文本内容
+        :return: 是否可以使用字形拼接
+        """
+        return all(char in self.glyph_chars for char in text)
+
+    def size(self, text, size, color):
+        """计算文本图像的尺寸，不需要渲染文本
+
+        :param text: 文本内容
+        :param size: 字体大小
+        :param color: 字体颜色
+        :return: (宽度, 高度)
+        """
+        font = self.get_font(size)
+
+        if not self.is_composable(text):
+            return font.size(text)
+
+        width = sum(self.get_glyph(char, size, color).get_width() for char in text)
+
+        return max(width, 1), font.get_height()
+
+    def render(self, text, size, color):
+        """渲染文本
+
+        :param text: 文本内容
+        :param size: 字体大小
+        :param color: 字体颜色
+        :return: 文本图像
+        """
+        # 1. 包含其他字符的文本，完整渲染并缓存
+        if not self.is_composable(text):
+            key = (size, color, text)
+            image = self.texts.get(key)
+
+            if image is None:
+                image = self.get_font(size).render(text, True, color)
+                self.texts[key] = image
+                self.text_renders += 1
+
+            return image
+
+        # 2. 使用缓存的字形拼接文本
+        image = pygame.Surface(self.size(text, size, color), pygame.SRCALPHA)
+
+        # 字形之间互不重叠，取最大值相当于直接复制字形像素
+        blit_list = []
+        x = 0
+        for char in text:
+            glyph = self.get_glyph(char, size, color)
+            blit_list.append((glyph, (x, 0), None, pygame.BLEND_RGBA_MAX))
+            x += glyph.get_width()
+
+        image.blits(blit_list, False)
+
+        self.composes += 1
+
+        return image
+
+    def stats(self):
+        """渲染统计
+
+        :return: 包含字体数量及各种渲染次数的字典
+        """
+        return {"fonts": len(self.fonts),
+                "glyph_renders": self.glyph_renders,
+                "text_renders": self.text_renders,
+                "composes": self.composes}
+
+
+# 进程内共享的文本渲染器
+text_renderer = TextRenderer()
+
+
+class Label(pygame.sprite.Sprite):
+    """文本标签精灵
+
+    设置文本时只计算尺寸，绘制时才生成图像，同一帧内多次设置文本只生成 1 次图像
+    """
 
     def __init__(self, text, size, color, *groups):
         """初始化方法
@@ -33,48 +179,78 @@ class Label(pygame.sprite.Sprite):
         """
         super().__init__(*groups)
 
-        self.font = pygame.font.Font(self.font_path, size)
+        self.size = size
         self.color = color
 
-        self.image = self.font.render(text, True, self.color)
-        self.rect = self.image.get_rect()
+        self.set_text(text)
+
+    @property
+    def image(self):
+        """文本图像，文本变化后第一次使用时生成"""
+
+        if self.text_image is None:
+            self.text_image = text_renderer.render(self.text, self.size, self.color)
+
+        return self.text_image
 
     def set_text(self, text):
-        """设置文本，使用指定的文本重新渲染 image，并且更新 rect
+        """设置文本，并且按照文本图像的尺寸更新 rect
 
         :param text: 文本内容
         """
-        self.image = self.font.render(text, True, self.color)
-        self.rect = self.image.get_rect()
+        self.text = text
+        self.text_image = None
+
+        self.rect = pygame.Rect((0, 0), text_renderer.size(text, self.size, self.color))
 
 
 class GameSprite(pygame.sprite.Sprite):
     """游戏精灵类"""
 
-    res_path = "./res/images/"  # 图片资源路径
-
     def __init__(self, image_name, speed, *groups):
         """初始化方法
 
         :param image_name: 要加载的图片文件名
-        :param speed: 移动速度，0 表示静止
+        :param speed: 移动速度，单位像素/秒，0 表示静止
         :param groups: 要添加到的精灵组，不传则不添加
         """
         super().__init__(*groups)
 
-        self.image = pygame.image.load(self.res_path + image_name)  # 图像
+        self.image = assets.load_image(image_name)  # 图像
         self.rect = self.image.get_rect()  # 矩形区域，默认在左上角
-        self.speed = speed  # 移动速度
+        self.speed = speed  # 移动速度，单位像素/秒
+
+        # 不足 1 像素的移动距离，累计到下一个模拟步长
+        self.remainder_x = 0.0
+        self.remainder_y = 0.0
+
+        # 图像遮罩，可以提高碰撞检测的执行性能，所有同名图像的精灵共享
+        self.mask = assets.load_mask(image_name)
+
+    def move(self, speed_x, speed_y):
+        """按照速度移动 1 个模拟步长
+
+        :param speed_x: 水平速度，单位像素/秒
+        :param speed_y: 垂直速度，单位像素/秒
+        """
+        self.remainder_x += speed_x * SIM_STEP
+        self.remainder_y += speed_y * SIM_STEP
 
-        # 图像遮罩，可以提高碰撞检测的执行性能
-        self.mask = pygame.mask.from_surface(self.image)
+        # 只移动整数像素，剩余的距离留到下一步
+        dx = int(self.remainder_x)
+        dy = int(self.remainder_y)
+
+        self.remainder_x -= dx
+        self.remainder_y -= dy
+
+        self.rect.move_ip(dx, dy)
 
     def update(self, *args):
         """更新精灵位置，默认在垂直方向移动
 
         :param args:
         """
-        self.rect.y += self.speed
+        self.move(0, self.speed)
 
 
 class StatusButton(GameSprite):
@@ -89,8 +265,7 @@ class StatusButton(GameSprite):
         super().__init__(image_names[0], 0, *groups)
 
         # 加载图像
-        self.images = [pygame.image.load(self.res_path + name)
-                       for name in image_names]
+        self.images = [assets.load_image(name) for name in image_names]
 
     def switch_status(self, is_pause):
         """切换状态
@@ -100,24 +275,74 @@ class StatusButton(GameSprite):
         self.image = self.images[1 if is_pause else 0]
 
 
-class Background(GameSprite):
-    """背景精灵类"""
+class Background(object):
+    """滚动背景类
 
-    def __init__(self, is_alt, *groups):
+    背景不是精灵，由渲染器在所有精灵之前绘制。第 1 层转换为不透明的显示格式，
+    其他视差层保留透明通道，每层图像与窗口一样大，每次绘制只需要 2 次 blit，
+    首尾相接覆盖整个窗口
+    """
 
-        super().__init__("background.png", 1, *groups)
+    def __init__(self, layers=BACKGROUND_LAYERS):
+        """初始化方法
 
-        # 判断是否是另 1 个精灵
-        if is_alt:
-            self.rect.y = -self.rect.h  # 设置到游戏窗口正上方
+        :param layers: 背景层列表，每一项是 (图片文件名, 滚动速度)，速度单位像素/秒
+        """
+        self.layers = []  # 背景层列表，每一项是 [图像, 速度, 滚动位置, 上一步的滚动位置]
 
-    def update(self, *args):
+        for index, (image_name, speed) in enumerate(layers):
+            image = assets.load_image(image_name)
+
+            # 第 1 层铺满窗口，不需要透明通道，转换为不透明的显示格式可以直接复制像素
+            if index == 0 and pygame.display.get_surface() is not None:
+                image = image.convert()
+
+            self.layers.append([image, speed, 0.0, 0.0])
+
+        self.positions = [0] * len(self.layers)  # 绘制时各层的滚动位置，单位像素
+        self.is_parallax = True  # 是否滚动显示，关闭时停在当前位置，只绘制第 1 层
+
+    def update(self):
+        """按照速度滚动 1 个模拟步长"""
 
-        super().update(*args)  # 向下运动
+        for layer in self.layers:
+            height = layer[0].get_height()
 
-        # 判断是否移出游戏窗口
-        if self.rect.y >= self.rect.h:
-            self.rect.y = -self.rect.h
+            layer[3] = layer[2]
+            layer[2] = (layer[2] + layer[1] * SIM_STEP) % height
+
+    def interpolate(self, alpha):
+        """计算绘制时各层的滚动位置
+
+        :param alpha: 插值系数，0 表示上一步的位置，1 表示当前步的位置
+        """
+        # 关闭滚动显示时保持上一次的位置，脏矩形渲染器不需要退回完整刷新
+        if not self.is_parallax:
+            return
+
+        for index, (image, speed, position, last_position) in enumerate(self.layers):
+            height = image.get_height()
+
+            # 滚动位置回到开头时，按照没有回绕的位置插值
+            if position < last_position:
+                position += height
+
+            self.positions[index] = int(last_position
+                                        + (position - last_position) * alpha) % height
+
+    def draw(self, surface):
+        """绘制全部背景层，使用表面的裁剪区域可以只重绘部分区域
+
+        :param surface: 要绘制的表面
+        """
+        layers = self.layers if self.is_parallax else self.layers[:1]
+
+        for (image, speed, position, last_position), y in zip(layers, self.positions):
+            # 图像下半部分显示在窗口上方，上半部分显示在窗口下方
+            height = image.get_height()
+
+            surface.blit(image, (0, 0), (0, height - y, image.get_width(), y))
+            surface.blit(image, (0, y), (0, 0, image.get_width(), height - y))
 
 
 class Plane(GameSprite):
@@ -147,14 +372,12 @@ class Plane(GameSprite):
 
         # 图像属性
         # 1> 正常图像列表及索引
-        self.normal_images = [pygame.image.load(self.res_path + name)
-                              for name in normal_names]
+        self.normal_images = [assets.load_image(name) for name in normal_names]
         self.normal_index = 0
         # 2> 受伤图像
-        self.hurt_image = pygame.image.load(self.res_path + hurt_name)
+        self.hurt_image = assets.load_image(hurt_name)
         # 3> 被摧毁图像列表及索引
-        self.destroy_images = [pygame.image.load(self.res_path + name)
-                               for name in destroy_names]
+        self.destroy_images = [assets.load_image(name) for name in destroy_names]
         self.destroy_index = 0
 
     def reset_plane(self):
@@ -193,16 +416,20 @@ class Plane(GameSprite):
 class Enemy(Plane):
     """敌机类"""
 
-    def __init__(self, kind, max_speed, *groups):
+    def __init__(self, kind, max_speed, *groups, rng=random, is_reserve=False):
         """初始化方法
 
         :param kind: 敌机类型 0 小敌机 1 中敌机 2 大敌机
-        :param max_speed: 最大速度
+        :param max_speed: 最大速度，单位像素/秒
         :param groups: 要添加到的精灵组
+        :param rng: 随机数生成器，默认使用 random 模块
+        :param is_reserve: 是否创建为预备敌机，预备敌机只加载图像，不重置位置，调用 activate 之后才参与游戏
         """
-        # 1. 记录敌机类型和最大速度
+        # 1. 记录敌机类型、最大速度和随机数生成器
         self.kind = kind
         self.max_speed = max_speed
+        self.rng = rng
+        self.dormant_steps = 0  # 休眠剩余的步数，大于 0 时只倒数，不更新图像和位置
 
         # 2. 根据类型调用父类方法传递不同参数
         if kind == 0:
@@ -225,30 +452,62 @@ class Enemy(Plane):
                              *groups)
 
         # 3. 调用重置飞机方法，设置敌机初始位置和速度
+        if not is_reserve:
+            self.reset_plane()
+
+    def activate(self, max_speed, *groups):
+        """启用预备敌机，加入精灵组并重置到窗口上方
+
+        :param max_speed: 最大速度，单位像素/秒
+        :param groups: 要添加到的精灵组
+        """
+        self.max_speed = max_speed
+
+        self.add(*groups)
         self.reset_plane()
 
+    def deactivate(self):
+        """停用敌机，从所有精灵组中移除，之后可以再次启用"""
+
+        pygame.sprite.Sprite.kill(self)
+
     def reset_plane(self):
         """重置飞机"""
         super().reset_plane()
 
         # 设置初始随机位置
-        x = random.randint(0, SCREEN_RECT.w - self.rect.w)
-        y = random.randint(0, SCREEN_RECT.h - self.rect.h) - SCREEN_RECT.h
+        x = self.rng.randint(0, SCREEN_RECT.w - self.rect.w)
+        y = self.rng.randint(0, SCREEN_RECT.h - self.rect.h) - SCREEN_RECT.h
 
         self.rect.topleft = (x, y)
 
         # 设置初始速度
-        self.speed = random.randint(1, self.max_speed)
+        self.speed = self.rng.randint(ENEMY_MIN_SPEED, self.max_speed)
+
+        # 在窗口上方等待的敌机进入休眠，直接移动到进入窗口之前的位置，
+        # 休眠期间只倒数移动所需的步数
+        step_distance = self.speed * SIM_STEP
+        self.dormant_steps = int(-self.rect.bottom / step_distance)
+
+        distance = self.dormant_steps * step_distance
+        self.rect.y += int(distance)
+        self.remainder_y = distance - int(distance)
 
     def update(self, *args):
         """更新图像和位置"""
 
+        # 休眠的敌机只倒数
+        if self.dormant_steps > 0:
+            self.dormant_steps -= 1
+
+            return
+
         # 调用父类方法更新飞机图像 - 注意 args 需要拆包
         super().update(*args)
 
         # 判断敌机是否被摧毁，否则使用速度更新飞机位置
         if self.hp > 0:
-            self.rect.y += self.speed
+            self.move(0, self.speed)
 
         # 判断是否飞出屏幕，如果是，重置飞机
         if self.rect.y >= SCREEN_RECT.h:
@@ -258,12 +517,22 @@ class Enemy(Plane):
 class Hero(Plane):
     """英雄类"""
 
-    def __init__(self, *groups):
+    def __init__(self, *groups, scheduler=None, on_fire=None, on_dead=None,
+                 bullet_capacity=BULLET_POOL_CAPACITY, bullet_factory=None):
         """初始化方法
 
         :param groups: 要添加到的精灵组
+        :param scheduler: 调度器，用于计划发射子弹和取消无敌，不传则创建新的调度器
+        :param on_fire: 每次发射子弹时调用的函数，没有参数，不传则不发射子弹
+        :param on_dead: 英雄牺牲之后调用的函数，没有参数
+        :param bullet_capacity: 子弹对象池容量
+        :param bullet_factory: 创建子弹的函数，参数是子弹类型，不传则使用 Bullet
         """
-        super().__init__(1000, 5, 0, "me_down.wav",
+        self.scheduler = scheduler if scheduler is not None else Scheduler()
+        self.on_dead = on_dead
+        self.power_task = None  # 取消无敌的任务
+
+        super().__init__(1000, 300, 0, "me_down.wav",
                          ["me%d.png" % i for i in range(1, 3)],
                          "me1.png",
                          ["me_destroy_%d.png" % i for i in range(1, 5)],
@@ -274,12 +543,15 @@ class Hero(Plane):
 
         self.bullets_kind = 0  # 子弹类型
         self.bullets_group = pygame.sprite.Group()  # 子弹精灵组
+        self.bullet_pool = BulletPool(bullet_capacity, bullet_factory)  # 子弹对象池
 
         # 初始位置
         self.rect.midbottom = HERO_DEFAULT_MID_BOTTOM
 
-        # 设置 0.2 秒发射子弹定时器事件
-        pygame.time.set_timer(HERO_FIRE_EVENT, 200)
+        # 每 0.2 秒发射子弹
+        self.fire_task = None
+        if on_fire is not None:
+            self.fire_task = self.scheduler.call_every(HERO_FIRE_INTERVAL, on_fire)
 
     def reset_plane(self):
         """重置英雄"""
@@ -292,11 +564,21 @@ class Hero(Plane):
         self.bomb_count = HERO_BOMB_COUNT  # 炸弹数量
         self.bullets_kind = 0  # 子弹类型
 
-        # 发布英雄牺牲事件
-        pygame.event.post(pygame.event.Event(HERO_DEAD_EVENT))
+        # 下次推进模拟时间时通知英雄牺牲
+        if self.on_dead is not None:
+            self.scheduler.call_later(0, self.on_dead)
+
+        # 3 秒之后取消无敌，重新计时
+        self.scheduler.cancel(self.power_task)
+        self.power_task = self.scheduler.call_later(HERO_POWER_TIME, self.power_off)
 
-        # 设置 3 秒之后取消无敌定时器事件
-        pygame.time.set_timer(HERO_POWER_OFF_EVENT, 3000)
+    def power_off(self):
+        """取消无敌状态"""
+
+        print("取消无敌状态...")
+
+        self.is_power = False
+        self.power_task = None
 
     def update(self, *args):
         """更新英雄的图像及矩形区域
@@ -311,9 +593,8 @@ class Hero(Plane):
         if len(args) != 3 or self.hp <= 0:
             return
 
-        # 调整水平移动距离
-        self.rect.x += args[1] * self.speed
-        self.rect.y += args[2] * self.speed
+        # 调整移动距离
+        self.move(args[1] * self.speed, args[2] * self.speed)
 
         # 限定在游戏窗口内部移动
         self.rect.x = 0 if self.rect.x < 0 else self.rect.x
@@ -365,26 +646,28 @@ class Hero(Plane):
         # self.bullets_kind = 1
 
         for i in range(3):
-            # 创建子弹精灵
-            bullet1 = Bullet(self.bullets_kind, *groups)
-
             # 计算子弹的垂直位置
             y = self.rect.y - i * 15
 
-            # 判断子弹类型
+            # 判断子弹类型，计算子弹的位置
             if self.bullets_kind == 0:
-                bullet1.rect.midbottom = (self.rect.centerx, y)
+                positions = [(self.rect.centerx, y)]
             else:
-                bullet1.rect.midbottom = (self.rect.centerx - 20, y)
+                positions = [(self.rect.centerx - 20, y),
+                             (self.rect.centerx + 20, y)]
 
-                # 再创建一颗子弹
-                bullet2 = Bullet(self.bullets_kind, *groups)
-                bullet2.rect.midbottom = (self.rect.centerx + 20, y)
+            for position in positions:
+                # 从对象池中取出子弹精灵，对象池耗尽时放弃本次发射
+                bullet = self.bullet_pool.acquire(self.bullets_kind, position, *groups)
+                if bullet is None:
+                    return
 
 
 class Bullet(GameSprite):
     """子弹类"""
 
+    image_names = ("bullet1.png", "bullet2.png")  # 不同类型子弹的图片文件名
+
     def __init__(self, kind, *groups):
         """初始化方法
 
@@ -392,10 +675,44 @@ class Bullet(GameSprite):
         :param groups: 要添加到的精灵组
         """
 
-        image_name = "bullet1.png" if kind == 0 else "bullet2.png"
-        super().__init__(image_name, -12, *groups)
+        super().__init__(self.image_names[kind], -720, *groups)
 
+        self.kind = kind  # 子弹类型
         self.damage = 1  # 杀伤力
+        self.pool = None  # 所属的对象池
+
+    def set_kind(self, kind):
+        """切换子弹类型，使用共享的图像和遮罩
+
+        :param kind: 子弹类型
+        """
+        if kind == self.kind:
+            return
+
+        self.kind = kind
+        self.image = assets.load_image(self.image_names[kind])
+        self.mask = assets.load_mask(self.image_names[kind])
+        self.rect.size = self.image.get_size()
+
+    def place(self, midbottom):
+        """设置子弹的位置
+
+        :param midbottom: 子弹底部中点的坐标
+        """
+        self.rect.midbottom = midbottom
+        self.remainder_y = 0.0
+
+    def kill(self):
+        """从所有精灵组中移除，如果属于对象池，归还到对象池"""
+
+        # 已经移除的子弹不需要重复归还
+        if not self.alive():
+            return
+
+        super().kill()
+
+        if self.pool is not None:
+            self.pool.release(self)
 
     def update(self, *args):
         super().update(*args)  # 向上移动
@@ -405,22 +722,95 @@ class Bullet(GameSprite):
             self.kill()
 
 
+class BulletPool(object):
+    """子弹对象池类"""
+
+    def __init__(self, capacity, factory=None):
+        """初始化方法，预先创建全部子弹
+
+        :param capacity: 对象池容量
+        :param factory: 创建子弹的函数，参数是子弹类型，不传则使用 Bullet
+        """
+        self.capacity = capacity
+
+        factory = factory if factory is not None else Bullet
+
+        # 空闲子弹列表
+        self.free_bullets = []
+        for i in range(capacity):
+            bullet = factory(0)
+            bullet.pool = self
+
+            self.free_bullets.append(bullet)
+
+        # 对象池统计
+        self.exhausted_count = 0  # 对象池耗尽的次数
+        self.high_water = 0  # 同时使用的最大子弹数量
+
+    @property
+    def used_count(self):
+        """正在使用的子弹数量"""
+        return self.capacity - len(self.free_bullets)
+
+    def acquire(self, kind, midbottom, *groups):
+        """从对象池取出子弹
+
+        :param kind: 子弹类型
+        :param midbottom: 子弹底部中点的坐标
+        :param groups: 要添加到的精灵组
+        :return: 子弹精灵，对象池耗尽时返回 None
+        """
+        if not self.free_bullets:
+            self.exhausted_count += 1
+
+            return None
+
+        bullet = self.free_bullets.pop()
+        bullet.set_kind(kind)
+        bullet.place(midbottom)
+        bullet.add(*groups)
+
+        self.high_water = max(self.high_water, self.used_count)
+
+        return bullet
+
+    def release(self, bullet):
+        """将子弹归还到对象池
+
+        :param bullet: 已经从精灵组中移除的子弹
+        """
+        self.free_bullets.append(bullet)
+
+    def stats(self):
+        """对象池统计
+
+        :return: 包含容量、正在使用的数量、同时使用的最大数量及耗尽次数的字典
+        """
+        return {"capacity": self.capacity,
+                "used": self.used_count,
+                "high_water": self.high_water,
+                "exhausted": self.exhausted_count}
+
+
 class Supply(GameSprite):
     """道具类"""
 
-    def __init__(self, kind, *groups):
+    def __init__(self, kind, *groups, rng=random):
         """初始化方法
 
         :param kind: 道具类型
         :param groups: 要添加到的精灵组
+        :param rng: 随机数生成器，默认使用 random 模块
         """
 
         # 调用父类方法
         image_name = "%s_supply.png" % ("bomb" if kind == 0 else "bullet")
-        super().__init__(image_name, 5, *groups)
+        super().__init__(image_name, 300, *groups)
 
         # 道具类型
         self.kind = kind
+        # 随机数生成器
+        self.rng = rng
         # 音频文件名
         self.wav_name = "get_%s.wav" % ("bomb" if kind == 0 else "bullet")
 
@@ -430,7 +820,7 @@ class Supply(GameSprite):
     def throw_supply(self):
         """投放道具"""
         self.rect.bottom = 0
-        self.rect.x = random.randint(0, SCREEN_RECT.w - self.rect.w)
+        self.rect.x = self.rng.randint(0, SCREEN_RECT.w - self.rect.w)
 
     def update(self, *args):
         """更新位置，在屏幕下方不移动"""
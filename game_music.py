@@ -1,55 +1,248 @@
 import os  # 需要遍历 res/sound 目录下的文件
+import threading
+import time
 import pygame
 
 
+class VoiceManager(object):
+    """音效通道管理类
+
+    每种音效分类使用独立的通道池，限制每个音效的冷却时间和同时播放的数量，
+    通道池已满时停止优先级最低的音效，保证大量音效同时触发时混音稳定
+    """
+
+    # 音效分类的通道数量
+    category_channels = {"weapon": 2, "explosion": 4, "event": 2}
+
+    # 音效播放规则，key 是文件名，value 是 (分类, 冷却毫秒数, 最大同时播放数量, 优先级)
+    sound_rules = {
+        "bullet.wav": ("weapon", 150, 1, 0),
+        "enemy1_down.wav": ("explosion", 60, 2, 1),
+        "enemy2_down.wav": ("explosion", 60, 2, 2),
+        "enemy3_down.wav": ("explosion", 0, 1, 3),
+        "supply.wav": ("event", 0, 1, 2),
+        "get_bomb.wav": ("event", 0, 1, 3),
+        "get_bullet.wav": ("event", 0, 1, 3),
+        "upgrade.wav": ("event", 0, 1, 4),
+        "use_bomb.wav": ("event", 0, 1, 4),
+        "me_down.wav": ("event", 0, 1, 5),
+    }
+    default_rule = ("event", 0, 1, 1)  # 没有规则的音效使用的默认规则
+
+    def __init__(self):
+        """初始化方法，保留通道并分配给各个分类"""
+
+        # 保留通道，Sound.play 自动分配通道时不会使用
+        count = sum(self.category_channels.values())
+        if pygame.mixer.get_num_channels() < count:
+            pygame.mixer.set_num_channels(count)
+        pygame.mixer.set_reserved(count)
+
+        # 通道池字典，key 是分类，value 是通道列表
+        self.pools = {}
+        index = 0
+        for category, channel_count in self.category_channels.items():
+            self.pools[category] = [pygame.mixer.Channel(i)
+                                    for i in range(index, index + channel_count)]
+            index += channel_count
+
+        self.voices = {}  # 通道正在播放的音效，key 是通道，value 是 (文件名, 优先级)
+        self.last_play_ticks = {}  # 音效最后一次播放的时间，key 是文件名
+
+        # 播放统计
+        self.played_count = 0  # 播放次数
+        self.coalesced_count = 0  # 冷却时间内合并到上一次播放的次数
+        self.dropped_count = 0  # 超出数量或者没有可用通道而放弃的次数
+        self.stolen_count = 0  # 停止低优先级音效后播放的次数
+
+    def play(self, wav_name, sound):
+        """按照播放规则播放音效
+
+        :param wav_name: 音效文件名
+        :param sound: 声音对象
+        """
+        category, cooldown, max_count, priority = self.sound_rules.get(wav_name,
+                                                                       self.default_rule)
+
+        # 1. 冷却时间内的重复播放合并到上一次播放
+        ticks = pygame.time.get_ticks()
+        last_ticks = self.last_play_ticks.get(wav_name)
+
+        if last_ticks is not None and ticks - last_ticks < cooldown:
+            self.coalesced_count += 1
+
+            return
+
+        # 2. 同时播放的数量已经达到上限
+        pool = self.pools[category]
+        busy_channels = [channel for channel in pool if channel.get_busy()]
+
+        count = sum(1 for channel in busy_channels
+                    if self.voices[channel][0] == wav_name)
+        if count >= max_count:
+            self.dropped_count += 1
+
+            return
+
+        # 3. 查找空闲通道，没有空闲通道时，停止优先级最低的音效
+        channel = next((channel for channel in pool if not channel.get_busy()), None)
+
+        if channel is None:
+            channel = min(busy_channels, key=lambda x: self.voices[x][1])
+
+            if self.voices[channel][1] > priority:
+                self.dropped_count += 1
+
+                return
+
+            self.stolen_count += 1
+
+        channel.play(sound)
+
+        self.voices[channel] = (wav_name, priority)
+        self.last_play_ticks[wav_name] = ticks
+        self.played_count += 1
+
+    def stats(self):
+        """播放统计
+
+        :return: 包含播放、合并、放弃及抢占次数的字典
+        """
+        return {"played": self.played_count,
+                "coalesced": self.coalesced_count,
+                "dropped": self.dropped_count,
+                "stolen": self.stolen_count}
+
+
 class MusicPlayer(object):
     """音乐播放器类"""
 
     res_path = "./res/sound/"  # 声音资源路径
 
-    def __init__(self, music_file):
+    # 第一帧之前就需要使用的音效，创建播放器时同步加载
+    preload_names = ("bullet.wav", "enemy1_down.wav")
+
+    def __init__(self, music_file, is_silent=False, load_mode="background",
+                 sound_names=None):
         """初始化方法
 
         :param music_file: 背景音乐文件名
+        :param is_silent: 是否静音，静音时不加载也不播放任何声音
+        :param load_mode: 其他音效的加载方式，background 在后台线程加载，lazy 第一次播放时加载
+        :param sound_names: 后台线程要加载的音效文件名列表，不传则加载目录下的全部文件
         """
+        self.is_silent = is_silent
+        self.is_sound_enabled = True  # 是否播放音效，关闭时背景音乐继续播放
+        self.load_mode = load_mode
+        self.sound_dict = {}  # 音效字典，使用文件名作为字典的 key
+        self.decode_times = {}  # 解码耗时字典，使用文件名作为字典的 key，单位秒
+        self.missing_names = set()  # 无法加载的音效文件名
+        self.loader = None  # 后台加载线程
+        self.voices = None  # 音效通道管理器
+
+        if is_silent:
+            return
+
+        self.voices = VoiceManager()
+
         # 1. 加载背景音乐
         pygame.mixer.music.load(self.res_path + music_file)
         pygame.mixer.music.set_volume(0.2)
 
-        # 2. 加载音效字典
-        # 1> 定义音效字典属性
-        self.sound_dict = {}
+        # 2. 同步加载预加载的音效
+        for file_name in self.preload_names:
+            self.load_sound(file_name)
 
-        # 2> 获取目录下的文件列表
-        files = os.listdir(self.res_path)
+        # 3. 在后台线程加载其他音效
+        if load_mode == "background":
+            if sound_names is None:
+                sound_names = os.listdir(self.res_path)
 
-        # 3> 遍历文件列表
-        for file_name in files:
+            # 排除背景音乐和已经加载的音效
+            file_names = [file_name for file_name in sound_names
+                          if file_name != music_file
+                          and file_name not in self.sound_dict]
 
-            # 排除背景音乐
-            if file_name == music_file:
-                continue
+            self.loader = threading.Thread(target=self.load_sounds,
+                                           args=(file_names,),
+                                           daemon=True)
+            self.loader.start()
 
-            # 创建声音对象
+    def load_sound(self, file_name):
+        """加载音效并记录解码耗时，无法加载的文件记录后忽略
+
+        :param file_name: 音效文件名
+        :return: 声音对象，无法加载时返回 None
+        """
+        start = time.perf_counter()
+
+        try:
             sound = pygame.mixer.Sound(self.res_path + file_name)
+        except (pygame.error, FileNotFoundError) as error:
+            print("无法加载音效 %s: %s" % (file_name, error))
+
+            self.missing_names.add(file_name)
+
+            return None
+
+        self.decode_times[file_name] = time.perf_counter() - start
+
+        # 添加到音效字典，使用文件名作为字典的 key
+        self.sound_dict[file_name] = sound
 
-            # 添加到音效字典，使用文件名作为字典的 key
-            self.sound_dict[file_name] = sound
+        return sound
+
+    def load_sounds(self, file_names):
+        """依次加载音效，在后台线程中执行
+
+        :param file_names: 音效文件名列表
+        """
+        for file_name in file_names:
+            self.load_sound(file_name)
+
+    def is_loading(self):
+        """后台线程是否正在加载音效"""
+        return self.loader is not None and self.loader.is_alive()
 
     def play_sound(self, wav_name):
-        """播放音效
+        """播放音效，尚未加载或者无法加载的音效不会阻塞游戏
 
         :param wav_name: 音效文件名
         """
-        self.sound_dict[wav_name].play()
+        if self.is_silent or not self.is_sound_enabled:
+            return
+
+        sound = self.sound_dict.get(wav_name)
+
+        if sound is None:
+            # 后台线程还没有加载到该音效，或者文件无法加载，跳过本次播放
+            if self.is_loading() or wav_name in self.missing_names:
+                return
+
+            sound = self.load_sound(wav_name)
+
+            if sound is None:
+                return
+
+        self.voices.play(wav_name, sound)
+
+    def play_music(self):
+        if self.is_silent:
+            return
 
-    @staticmethod
-    def play_music():
         pygame.mixer.music.play(-1)
 
-    @staticmethod
-    def pause_music(is_pause):
+    def pause_music(self, is_pause):
+        if self.is_silent:
+            return
+
         if is_pause:
             pygame.mixer.music.pause()
         else:
             pygame.mixer.music.unpause()
+
+    def close(self):
+        """等待后台线程结束，退出 pygame 之前调用"""
+
+        if self.loader is not None:
+            self.loader.join()
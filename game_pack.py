@@ -0,0 +1,167 @@
+"""资源包构建工具
+
+将 res/images 下的全部图片打包为一张图集，并预先计算每张图片的碰撞遮罩，
+图集和遮罩保存在 res/pack 目录下，游戏启动时只需要打开 2 个文件
+
+    python game_pack.py            构建资源包
+    python game_pack.py --compare  比较使用资源包和单独图片文件的加载耗时
+"""
+import json
+import os
+import time
+
+import pygame
+
+from game_assets import *
+
+ATLAS_WIDTH = 1024  # 图集宽度
+ATLAS_PADDING = 1  # 图片之间的间距
+
+
+def mask_rects(mask):
+    """将遮罩分解为矩形列表，相邻行中位置相同的区间合并为 1 个矩形
+
+    :param mask: 遮罩
+    :return: 矩形列表，每个矩形是 [x, y, w, h]
+    """
+    w, h = mask.get_size()
+
+    rects = []
+    open_rects = {}  # 上一行仍然可以向下延伸的矩形，key 是 (起点, 终点)
+
+    for y in range(h):
+        # 1. 计算当前行所有连续设置位的区间
+        spans = []
+        x = 0
+        while x < w:
+            if mask.get_at((x, y)):
+                start = x
+                while x < w and mask.get_at((x, y)):
+                    x += 1
+                spans.append((start, x))
+            else:
+                x += 1
+
+        # 2. 与上一行位置相同的区间向下延伸，其他区间开始新的矩形
+        next_rects = {}
+        for span in spans:
+            rect = open_rects.pop(span, None)
+
+            if rect is None:
+                rect = [span[0], y, span[1] - span[0], 0]
+                rects.append(rect)
+
+            rect[3] += 1
+            next_rects[span] = rect
+
+        open_rects = next_rects
+
+    return rects
+
+
+def build_pack():
+    """构建资源包
+
+    :return: 资源包清单
+    """
+    names = sorted(name for name in os.listdir(AssetManager.res_path)
+                   if name.endswith(".png"))
+    images = {name: pygame.image.load(AssetManager.res_path + name)
+              for name in names}
+
+    # 1. 按照高度从大到小逐行排列图片
+    frames = {}
+    x = y = shelf_height = 0
+
+    for name in sorted(names, key=lambda x: images[x].get_height(), reverse=True):
+        w, h = images[name].get_size()
+
+        if x + w > ATLAS_WIDTH:
+            x = 0
+            y += shelf_height + ATLAS_PADDING
+            shelf_height = 0
+
+        frames[name] = [x, y, w, h]
+
+        x += w + ATLAS_PADDING
+        shelf_height = max(shelf_height, h)
+
+    # 2. 绘制图集
+    atlas = pygame.Surface((ATLAS_WIDTH, y + shelf_height), pygame.SRCALPHA)
+    atlas.fill((0, 0, 0, 0))
+
+    for name, frame in frames.items():
+        atlas.blit(images[name], frame[:2], special_flags=pygame.BLEND_RGBA_MAX)
+
+    # 3. 预先计算遮罩
+    masks = {name: mask_rects(pygame.mask.from_surface(images[name]))
+             for name in names}
+
+    # 4. 保存图集及清单
+    os.makedirs(AssetManager.pack_path, exist_ok=True)
+
+    # 图集使用不压缩的 BMP 格式，加载时不需要解码 PNG
+    manifest = {"atlas": "atlas.bmp", "frames": frames, "masks": masks}
+
+    pygame.image.save(atlas, AssetManager.pack_path + manifest["atlas"])
+    with open(AssetManager.pack_path + AssetManager.manifest_name, "w") as file:
+        json.dump(manifest, file, separators=(",", ":"))
+
+    return manifest
+
+
+def load_all(manager, names):
+    """加载全部图片和遮罩
+
+    :param manager: 资源管理器
+    :param names: 图片文件名列表
+    :return: 耗时，单位秒
+    """
+    start = time.perf_counter()
+
+    for name in names:
+        manager.load_mask(name)
+
+    return time.perf_counter() - start
+
+
+def compare():
+    """比较使用资源包和单独图片文件的加载耗时及打开的文件数量"""
+
+    names = sorted(name for name in os.listdir(AssetManager.res_path)
+                   if name.endswith(".png"))
+
+    # 关闭资源包检查，使用单独的图片文件
+    loose = AssetManager()
+    loose.is_pack_checked = True
+
+    packed = AssetManager()
+
+    for title, manager in (("单独文件", loose), ("资源包", packed)):
+        elapsed = load_all(manager, names)
+
+        print("%s: 耗时 %.1f 毫秒，%s" % (title, elapsed * 1000, manager.stats()))
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="构建飞机大战资源包")
+    parser.add_argument("--compare", action="store_true",
+                        help="比较使用资源包和单独图片文件的加载耗时")
+    options = parser.parse_args()
+
+    pygame.init()
+
+    if options.compare:
+        # 与游戏相同，转换图像格式之前需要设置显示模式
+        pygame.display.set_mode((1, 1))
+
+        compare()
+    else:
+        result = build_pack()
+
+        print("资源包已保存到 %s，共 %d 张图片" % (AssetManager.pack_path,
+                                             len(result["frames"])))
+
+    pygame.quit()
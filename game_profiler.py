@@ -0,0 +1,210 @@
+import collections
+import csv
+import time
+
+import pygame
+
+from game_items import *
+
+
+class FrameProfiler(object):
+    """帧耗时分析器类
+
+    按照阶段累计每帧的耗时，保存到环形缓冲区，可以显示统计浮层，
+    也可以将缓冲区保存为 CSV 文件，未启用时每次记录只有一次属性判断
+    """
+
+    # 阶段名称
+    phase_names = ("event_handler", "check_collide", "update", "draw", "present")
+
+    font_size = 16  # 浮层字体大小
+    refresh_interval = 30  # 浮层每隔多少帧重新统计
+    background = (0, 0, 0, 160)  # 浮层背景颜色
+    color = (255, 255, 255)  # 浮层文字颜色
+
+    def __init__(self, capacity=600, enabled=False):
+        """初始化方法
+
+        :param capacity: 环形缓冲区保存的帧数
+        :param enabled: 是否启用
+        """
+        self.enabled = enabled
+
+        # 环形缓冲区，每一项是 (各阶段耗时..., 帧耗时, 敌机数量, 子弹数量, 剔除数量)，耗时单位秒
+        self.frames = collections.deque(maxlen=capacity)
+        # 相邻两帧结束之间的真实间隔，包括限制帧率等待的时间，用于计算帧率，单位秒
+        self.intervals = collections.deque(maxlen=capacity)
+        self.last_end = None  # 上一帧结束的时间
+
+        self.phase_times = dict.fromkeys(self.phase_names, 0.0)  # 当前帧各阶段的耗时
+        self.frame_start = 0.0  # 当前帧开始的时间
+        self.last_mark = 0.0  # 上一次记录的时间
+        self.is_frame_started = False  # 是否正在记录一帧，帧中途启用时从下一帧开始记录
+
+        self.overlay = None  # 浮层图像
+        self.overlay_age = 0  # 浮层已经显示的帧数
+
+    def toggle(self):
+        """切换启用状态，启用时显示浮层
+
+        切换发生在一帧的中途，这一帧不完整，不记录
+        """
+        self.enabled = not self.enabled
+        self.is_frame_started = False
+        self.last_end = None
+        self.overlay = None
+
+    def start_frame(self):
+        """开始记录一帧"""
+
+        self.is_frame_started = self.enabled
+
+        if not self.enabled:
+            return
+
+        self.frame_start = self.last_mark = time.perf_counter()
+
+        for name in self.phase_names:
+            self.phase_times[name] = 0.0
+
+    def mark(self, phase_name):
+        """将上一次记录到现在的耗时累计到指定阶段
+
+        :param phase_name: 阶段名称
+        """
+        if not self.is_frame_started:
+            return
+
+        now = time.perf_counter()
+
+        self.phase_times[phase_name] += now - self.last_mark
+        self.last_mark = now
+
+    def skip(self):
+        """不记录上一次记录到现在的耗时"""
+
+        if not self.is_frame_started:
+            return
+
+        self.last_mark = time.perf_counter()
+
+    def end_frame(self, enemy_count, bullet_count, culled_count=0):
+        """结束记录一帧，保存到环形缓冲区
+
+        :param enemy_count: 敌机数量
+        :param bullet_count: 子弹数量
+        :param culled_count: 窗口外没有绘制的精灵数量
+        """
+        if not self.is_frame_started:
+            return
+
+        self.is_frame_started = False
+
+        now = time.perf_counter()
+        frame_time = now - self.frame_start
+
+        if self.last_end is not None:
+            self.intervals.append(now - self.last_end)
+        self.last_end = now
+
+        self.frames.append(tuple(self.phase_times[name] for name in self.phase_names)
+                           + (frame_time, enemy_count, bullet_count, culled_count))
+
+    @staticmethod
+    def percentile(values, percent):
+        """计算百分位数
+
+        :param values: 已经排序的数值列表
+        :param percent: 百分比
+        :return: 百分位数
+        """
+        index = min(len(values) - 1, int(len(values) * percent / 100))
+
+        return values[index]
+
+    def summary(self):
+        """统计环形缓冲区中的全部帧
+
+        :return: 字典，key 是阶段名称，value 是 (平均值, p95, p99)，单位毫秒
+        """
+        result = {}
+
+        for index, name in enumerate(self.phase_names + ("frame",)):
+            values = sorted(frame[index] * 1000 for frame in self.frames)
+
+            if values:
+                result[name] = (sum(values) / len(values),
+                                self.percentile(values, 95),
+                                self.percentile(values, 99))
+
+        return result
+
+    def draw_overlay(self, surface):
+        """在表面左上角绘制统计浮层
+
+        :param surface: 要绘制的表面
+        :return: 浮层所在的矩形区域，没有绘制时返回 None
+        """
+        if not self.enabled or not self.frames:
+            return None
+
+        # 每隔一段时间重新统计，避免每帧渲染文字
+        self.overlay_age += 1
+
+        if self.overlay is None or self.overlay_age >= self.refresh_interval:
+            self.overlay = self.render_overlay()
+            self.overlay_age = 0
+
+        rect = self.overlay.get_rect(topleft=(0, 60))
+        surface.blit(self.overlay, rect)
+
+        return rect
+
+    def render_overlay(self):
+        """渲染统计浮层图像
+
+        :return: 浮层图像
+        """
+        summary = self.summary()
+        last_frame = self.frames[-1]
+
+        # 帧耗时只包括工作时间，帧率按照相邻两帧之间的真实间隔计算
+        interval_avg = sum(self.intervals) / len(self.intervals) if self.intervals else 0
+
+        lines = ["%-14s %6s %6s %6s" % ("phase (ms)", "avg", "p95", "p99")]
+        for name in self.phase_names:
+            lines.append("%-14s %6.2f %6.2f %6.2f" % ((name,) + summary[name]))
+
+        lines.append("fps %.1f  enemies %d  bullets %d  culled %d" %
+                     ((1 / interval_avg if interval_avg > 0 else 0,) + last_frame[-3:]))
+
+        # 浮层文字每次都不同，直接使用字体渲染，不放入文本缓存
+        font = text_renderer.get_font(self.font_size)
+        images = [font.render(line, True, self.color) for line in lines]
+
+        width = max(image.get_width() for image in images) + 8
+        height = sum(image.get_height() for image in images) + 8
+
+        overlay = pygame.Surface((width, height), pygame.SRCALPHA)
+        overlay.fill(self.background)
+
+        y = 4
+        for image in images:
+            overlay.blit(image, (4, y))
+            y += image.get_height()
+
+        return overlay
+
+    def save_csv(self, filename):
+        """将环形缓冲区保存为 CSV 文件，单位毫秒
+
+        :param filename: 文件名
+        """
+        with open(filename, "w", newline="") as file:
+            writer = csv.writer(file)
+
+            writer.writerow(self.phase_names + ("frame", "enemies", "bullets", "culled"))
+
+            for frame in self.frames:
+                writer.writerow(["%.4f" % (value * 1000) for value in frame[:-3]]
+                                + list(frame[-3:]))
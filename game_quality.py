@@ -0,0 +1,176 @@
+import csv
+import time
+
+# 降低质量的顺序，级别 n 表示已经执行了前 n 项，恢复时按照相反的顺序
+QUALITY_STEPS = ("render_skip_1",  # 每 2 次循环渲染 1 次
+                 "render_skip_2",  # 每 3 次循环渲染 1 次
+                 "destroy_animation",  # 不绘制飞机被摧毁的动画
+                 "parallax",  # 背景停止滚动，只绘制第 1 层
+                 "sound")  # 不播放音效，背景音乐不受影响
+
+QUALITY_TARGET_FPS = 60  # 不限制帧率时使用的目标帧率
+
+# 决策记录的 CSV 字段
+QUALITY_LOG_FIELDS = ("time", "frame", "frame_ms", "action", "step", "level")
+
+
+class QualityController(object):
+    """自适应质量控制器类
+
+    统计每次循环（模拟及可能的渲染）的耗时，不包括限制帧率等待的时间，
+    每次渲染时计算上一次渲染以来各次循环的平均耗时，跳过的循环只有模拟，
+    跳过渲染之后平均耗时会降低，即按照渲染间隔放大了每个渲染帧的预算。
+    使用指数滑动平均平滑之后，持续超过预算时按照 QUALITY_STEPS 的顺序逐级降低质量，
+    持续低于预算的一定比例时逐级恢复，两个阈值之间的耗时不改变级别，避免来回切换。
+    只影响渲染、背景和音效，不影响模拟，录像回放的结果与质量级别无关
+    """
+
+    degrade_ratio = 1.0  # 平均循环耗时超过预算的该倍数时，计入降级帧数
+    recover_ratio = 0.6  # 平均循环耗时低于预算的该倍数时，计入恢复帧数
+    degrade_frames = 30  # 连续多少个渲染帧超过预算时降低 1 级
+    recover_frames = 120  # 连续多少个渲染帧低于预算时恢复 1 级
+    smoothing = 0.1  # 指数滑动平均的系数
+
+    def __init__(self, budget_ms=1000 / QUALITY_TARGET_FPS, enabled=False, on_change=None):
+        """初始化方法
+
+        :param budget_ms: 每次循环的耗时预算，单位毫秒，通常是最大帧率对应的帧间隔
+        :param enabled: 是否启用，未启用时一直保持最高质量
+        :param on_change: 级别变化时调用的函数，参数是控制器
+        """
+        self.budget_ms = budget_ms
+        self.enabled = enabled
+        self.on_change = on_change
+
+        self.level = 0  # 质量级别，0 表示最高质量
+        self.frame_ms = None  # 平均循环耗时的滑动平均值，单位毫秒
+        self.cycle_ms = 0.0  # 上一次渲染之后各次循环的累计耗时，单位毫秒
+        self.cycle_passes = 0  # 上一次渲染之后的循环次数
+        self.over_count = 0  # 连续超过预算的帧数
+        self.under_count = 0  # 连续低于预算的帧数
+
+        self.skip_count = 0  # 上一次渲染之后跳过的次数
+        self.skipped_total = 0  # 累计跳过的渲染次数
+
+        self.start_time = time.perf_counter()
+        self.decisions = []  # 决策记录，每一项是 QUALITY_LOG_FIELDS 对应的元组
+
+    @property
+    def render_skip(self):
+        """每次渲染之间跳过的次数"""
+        return min(self.level, 2)
+
+    @property
+    def is_destroy_animation(self):
+        """是否绘制飞机被摧毁的动画"""
+        return self.level < 3
+
+    @property
+    def is_parallax(self):
+        """是否滚动背景并绘制视差层"""
+        return self.level < 4
+
+    @property
+    def is_sound(self):
+        """是否播放音效"""
+        return self.level < 5
+
+    def should_render(self):
+        """判断本次循环是否渲染
+
+        :return: 需要渲染返回 True，跳过返回 False
+        """
+        if self.skip_count < self.render_skip:
+            self.skip_count += 1
+            self.skipped_total += 1
+
+            return False
+
+        self.skip_count = 0
+
+        return True
+
+    def end_pass(self, busy_ms, is_rendered, frame_count):
+        """记录 1 次循环的耗时，渲染时判断是否需要调整级别
+
+        :param busy_ms: 本次循环模拟和渲染的耗时，单位毫秒，不包括限制帧率等待的时间
+        :param is_rendered: 本次循环是否渲染，跳过渲染的循环只累计耗时
+        :param frame_count: 当前的模拟步数，记录在决策中
+        """
+        if not self.enabled:
+            return
+
+        self.cycle_ms += busy_ms
+        self.cycle_passes += 1
+
+        if not is_rendered:
+            return
+
+        # 渲染间隔内的平均循环耗时，与每次循环的预算比较，相当于渲染帧的预算乘以渲染间隔
+        pass_ms = self.cycle_ms / self.cycle_passes
+        self.cycle_ms = 0.0
+        self.cycle_passes = 0
+
+        if self.frame_ms is None:
+            self.frame_ms = pass_ms
+        else:
+            self.frame_ms += (pass_ms - self.frame_ms) * self.smoothing
+
+        if self.frame_ms > self.budget_ms * self.degrade_ratio:
+            self.over_count += 1
+            self.under_count = 0
+        elif self.frame_ms < self.budget_ms * self.recover_ratio:
+            self.under_count += 1
+            self.over_count = 0
+        else:
+            self.over_count = 0
+            self.under_count = 0
+
+        if self.over_count >= self.degrade_frames and self.level < len(QUALITY_STEPS):
+            self.set_level(self.level + 1, "degrade", QUALITY_STEPS[self.level], frame_count)
+        elif self.under_count >= self.recover_frames and self.level > 0:
+            self.set_level(self.level - 1, "recover", QUALITY_STEPS[self.level - 1], frame_count)
+
+    def set_level(self, level, action, step, frame_count):
+        """修改级别并记录决策
+
+        :param level: 新的级别
+        :param action: degrade 降级，recover 恢复
+        :param step: 执行或撤销的质量项
+        :param frame_count: 当前的模拟步数
+        """
+        self.level = level
+        self.over_count = 0
+        self.under_count = 0
+
+        self.decisions.append((time.perf_counter() - self.start_time, frame_count,
+                               self.frame_ms, action, step, level))
+
+        if self.on_change is not None:
+            self.on_change(self)
+
+    def stats(self):
+        """质量控制统计
+
+        :return: 包含当前级别、降级及恢复次数、跳过的渲染次数的字典
+        """
+        actions = [decision[3] for decision in self.decisions]
+
+        return {"level": self.level,
+                "degrades": actions.count("degrade"),
+                "recovers": actions.count("recover"),
+                "skipped_renders": self.skipped_total}
+
+    def save_log(self, filename):
+        """将决策记录保存为 CSV 文件
+
+        :param filename: 文件名
+        """
+        with open(filename, "w", newline="") as file:
+            writer = csv.writer(file)
+
+            writer.writerow(QUALITY_LOG_FIELDS)
+
+            for elapsed, frame, frame_ms, action, step, level in self.decisions:
+                writer.writerow(["%.3f" % elapsed, frame, "%.3f" % frame_ms,
+                                 action, step, level])
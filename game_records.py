@@ -0,0 +1,261 @@
+"""成绩存储
+
+使用 SQLite 保存每局游戏的得分、级别、时长和各类敌机的击毁数量，
+排行榜按照得分索引查询。所有数据库操作都在后台线程中执行，
+游戏循环只需要把记录放入队列，不会等待磁盘读写
+
+    python game_records.py            显示排行榜前 10 名
+    python game_records.py --top 20   显示排行榜前 20 名
+"""
+import concurrent.futures
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    finished_at REAL NOT NULL,
+    score INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    kills_small INTEGER NOT NULL,
+    kills_medium INTEGER NOT NULL,
+    kills_large INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_score ON sessions (score DESC);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class RecordStore(object):
+    """成绩存储类
+
+    后台线程独占数据库连接，依次处理队列中的写入和查询，
+    队列中累积的多条写入合并到同一个事务中提交，事务要么全部写入要么全部不写入，
+    写到一半退出也不会损坏已有的成绩
+    """
+
+    db_filename = "records.db"  # 数据库文件名
+    record_filename = "record.txt"  # 旧版本的最好成绩文件名，第一次打开数据库时导入
+
+    def __init__(self, db_filename=None):
+        """初始化方法，启动后台线程
+
+        :param db_filename: 数据库文件名，不传则使用 records.db
+        """
+        self.db_filename = db_filename or self.db_filename
+
+        self.queue = queue.Queue()  # 任务队列，每一项是 (函数, 参数, Future)，None 表示退出
+        self.best_score = 0  # 最好成绩，数据库打开之后设置
+        self.ready = threading.Event()  # 数据库已经打开，或者打开失败
+        self.error = None  # 打开数据库时的异常，不为 None 时存储被禁用，不再读写数据库
+
+        # 写入统计
+        self.commit_count = 0  # 提交事务的次数
+        self.write_count = 0  # 写入的记录数量
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """后台线程，打开数据库并依次处理队列中的任务"""
+
+        connection = None
+
+        try:
+            connection = sqlite3.connect(self.db_filename)
+            connection.executescript(SCHEMA)
+            self.migrate(connection)
+
+            self.best_score = self.query_best_score(connection)
+        except (sqlite3.Error, OSError) as error:
+            # 无法打开数据库时禁用存储，游戏照常运行，只是不保存成绩
+            self.error = error
+            print("无法打开成绩数据库 %s，成绩不会被保存: %s" % (self.db_filename, error))
+
+            if connection is not None:
+                connection.close()
+
+            return
+        finally:
+            self.ready.set()
+
+        is_running = True
+        while is_running:
+            # 取出队列中已经累积的全部任务
+            tasks = [self.queue.get()]
+            while True:
+                try:
+                    tasks.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # 同一批写入使用 1 个事务，提交成功之后才设置任务结果
+            results = []
+
+            try:
+                with connection:
+                    for task in tasks:
+                        if task is None:
+                            is_running = False
+                            continue
+
+                        function, args, future = task
+
+                        try:
+                            results.append((future, function(connection, *args), None))
+                        except Exception as error:
+                            results.append((future, None, error))
+
+                self.commit_count += 1
+            except sqlite3.Error as error:
+                # 提交失败时整批回滚，本批的全部任务都以该异常结束，线程继续处理之后的任务
+                print("写入成绩数据库 %s 失败: %s" % (self.db_filename, error))
+
+                results = [(future, None, error) for future, result, task_error in results]
+
+            for future, result, error in results:
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+
+        connection.close()
+
+    def migrate(self, connection):
+        """导入旧版本 record.txt 中的最好成绩，只导入 1 次
+
+        :param connection: 数据库连接
+        """
+        with connection:
+            if connection.execute("SELECT 1 FROM meta WHERE key = 'record_migrated'").fetchone():
+                return
+
+            try:
+                with open(self.record_filename) as file:
+                    score = int(file.readline())
+            except (FileNotFoundError, ValueError):
+                score = 0
+
+            if score > 0:
+                connection.execute("INSERT INTO sessions (finished_at, score, level, duration,"
+                                   " kills_small, kills_medium, kills_large)"
+                                   " VALUES (?, ?, 0, 0, 0, 0, 0)",
+                                   (os.path.getmtime(self.record_filename), score))
+
+            connection.execute("INSERT INTO meta (key, value) VALUES ('record_migrated', ?)",
+                               (str(score),))
+
+    @staticmethod
+    def query_best_score(connection):
+        """查询最好成绩
+
+        :param connection: 数据库连接
+        :return: 最好成绩，没有记录时返回 0
+        """
+        row = connection.execute("SELECT score FROM sessions ORDER BY score DESC LIMIT 1").fetchone()
+
+        return row[0] if row else 0
+
+    def submit(self, function, *args, default=None):
+        """将任务放入队列，在后台线程中执行
+
+        :param function: 任务函数，第 1 个参数是数据库连接
+        :param args: 其他参数
+        :param default: 存储被禁用时的任务结果
+        :return: Future 对象，可以等待任务结果，存储被禁用时已经完成
+        """
+        future = concurrent.futures.Future()
+
+        # 数据库打开失败时后台线程已经退出，直接完成任务
+        self.ready.wait()
+        if self.error is not None:
+            future.set_result(default)
+
+            return future
+
+        self.queue.put((function, args, future))
+
+        return future
+
+    def add_session(self, score, level, duration, kills):
+        """记录一局游戏，不等待写入完成
+
+        :param score: 得分
+        :param level: 达到的级别
+        :param duration: 游戏时长，单位秒
+        :param kills: 各类敌机的击毁数量，依次是小、中、大敌机
+        :return: Future 对象
+        """
+        if score > self.best_score:
+            self.best_score = score
+
+        return self.submit(self.insert_session,
+                           (time.time(), score, level, duration) + tuple(kills))
+
+    def insert_session(self, connection, values):
+        """写入一局游戏，在后台线程中执行
+
+        :param connection: 数据库连接
+        :param values: 字段值元组
+        """
+        connection.execute("INSERT INTO sessions (finished_at, score, level, duration,"
+                           " kills_small, kills_medium, kills_large)"
+                           " VALUES (?, ?, ?, ?, ?, ?, ?)", values)
+
+        self.write_count += 1
+
+    def top_scores(self, count=10):
+        """查询排行榜，使用得分索引
+
+        :param count: 名次数量
+        :return: Future 对象，结果是 (得分, 级别, 时长, 小, 中, 大敌机击毁数量, 完成时间) 列表
+        """
+        return self.submit(self.select_top_scores, count, default=[])
+
+    @staticmethod
+    def select_top_scores(connection, count):
+        """查询排行榜，在后台线程中执行
+
+        :param connection: 数据库连接
+        :param count: 名次数量
+        :return: 记录列表
+        """
+        return connection.execute("SELECT score, level, duration, kills_small, kills_medium,"
+                                  " kills_large, finished_at FROM sessions"
+                                  " ORDER BY score DESC LIMIT ?", (count,)).fetchall()
+
+    def close(self):
+        """写入队列中剩余的记录并关闭数据库，退出游戏时调用"""
+
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="飞机大战排行榜")
+    parser.add_argument("--top", type=int, default=10, help="显示的名次数量")
+    parser.add_argument("--db", default=None, help="数据库文件名")
+    options = parser.parse_args()
+
+    store = RecordStore(options.db)
+
+    rows = store.top_scores(options.top).result()
+    store.close()
+
+    print("%4s %10s %4s %8s %6s %6s %6s  %s" %
+          ("名次", "得分", "级别", "时长", "小", "中", "大", "时间"))
+
+    for rank, (score, level, duration, small, medium, large, finished_at) in enumerate(rows, 1):
+        print("%4d %10d %4d %8.1f %6d %6d %6d  %s" %
+              (rank, score, level, duration, small, medium, large,
+               time.strftime("%Y-%m-%d %H:%M", time.localtime(finished_at))))
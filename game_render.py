@@ -0,0 +1,222 @@
+import time
+import pygame
+
+
+class FullRenderer(object):
+    """完整刷新渲染器，每帧绘制窗口内的全部精灵并刷新整个窗口
+
+    精灵按照层绘制，背景之后依次绘制每一层，后面的层显示在上方，
+    每层的精灵收集为 (图像, 位置) 序列，使用 1 次 Surface.blits 提交
+    """
+
+    def __init__(self, surface, background=None):
+        """初始化方法
+
+        :param surface: 绘制精灵的目标表面，通常是游戏主窗口
+        :param background: 在精灵之前绘制的滚动背景，不传则不绘制背景
+        """
+        self.surface = surface
+        self.background = background
+        self.screen_rect = surface.get_rect()  # 窗口矩形区域
+        # 是否绘制到显示窗口，绘制到独立表面时不需要提交显示
+        self.is_display = surface is pygame.display.get_surface()
+
+        # 剔除统计
+        self.culled_count = 0  # 上一帧剔除的精灵数量
+        self.culled_total = 0  # 累计剔除的精灵数量
+
+        # 提交显示统计
+        self.frame_count = 0  # 渲染帧数
+        self.present_count = 0  # 实际提交显示的次数
+        self.present_time = 0.0  # 提交显示的累计耗时，单位秒
+        self.background_time = 0.0  # 绘制背景的累计耗时，单位秒
+
+    def invalidate(self, rect):
+        """标记在下一帧需要重绘的区域，例如精灵之外绘制到窗口上的浮层
+
+        完整刷新每帧都重绘整个窗口，不需要记录
+
+        :param rect: 矩形区域
+        """
+        pass
+
+    def cull(self, layers):
+        """剔除与窗口不相交的精灵
+
+        :param layers: 按照从下到上的顺序排列的精灵组列表
+        :return: 每层与窗口相交的精灵列表，保持精灵组中的顺序
+        """
+        screen_rect = self.screen_rect
+        visible_layers = [[sprite for sprite in sprites
+                           if screen_rect.colliderect(sprite.rect)]
+                          for sprites in layers]
+
+        self.culled_count = (sum(len(sprites) for sprites in layers)
+                             - sum(len(sprites) for sprites in visible_layers))
+        self.culled_total += self.culled_count
+
+        return visible_layers
+
+    def draw(self, layers):
+        """绘制背景及各层精灵
+
+        :param layers: 按照从下到上的顺序排列的精灵组列表
+        :return: 需要刷新的矩形区域列表，None 表示刷新整个窗口
+        """
+        self.draw_background()
+
+        for sprites in self.cull(layers):
+            self.blit_sprites(sprites)
+
+        return None
+
+    def draw_background(self):
+        """绘制背景并累计耗时，使用表面的裁剪区域可以只重绘部分区域"""
+
+        if self.background is None:
+            return
+
+        start = time.perf_counter()
+
+        self.background.draw(self.surface)
+
+        self.background_time += time.perf_counter() - start
+
+    def blit_sprites(self, sprites):
+        """使用 1 次 blits 按顺序绘制 1 层精灵
+
+        :param sprites: 精灵列表
+        """
+        if sprites:
+            self.surface.blits([(sprite.image, sprite.rect) for sprite in sprites], False)
+
+    def present(self, rects):
+        """提交显示并累计耗时
+
+        :param rects: 要刷新的矩形区域列表，None 表示刷新整个窗口，空列表表示不需要刷新
+        """
+        self.frame_count += 1
+
+        if not self.is_display or (rects is not None and not rects):
+            return
+
+        start = time.perf_counter()
+
+        if rects is None:
+            pygame.display.update()
+        else:
+            pygame.display.update(rects)
+
+        self.present_time += time.perf_counter() - start
+        self.present_count += 1
+
+    def stats(self):
+        """渲染统计
+
+        :return: 包含渲染帧数、提交次数、平均每帧提交及绘制背景耗时（毫秒）
+                 及平均每帧剔除数量的字典
+        """
+        frames = max(self.frame_count, 1)
+
+        return {"frames": self.frame_count,
+                "presents": self.present_count,
+                "present_ms": self.present_time * 1000 / frames,
+                "background_ms": self.background_time * 1000 / frames,
+                "culled": self.culled_total / frames}
+
+
+class DirtyRenderer(FullRenderer):
+    """脏矩形渲染器，只重绘并刷新发生变化的区域
+
+    比较每个精灵与上一帧的图像和位置，变化前后的矩形区域都是脏矩形，
+    在脏矩形内先重绘背景再重绘精灵，背景滚动时整个窗口都会变化，此时退回到完整刷新
+    """
+
+    full_ratio = 0.5  # 脏矩形总面积超过窗口面积的比例时，退回完整刷新
+
+    def __init__(self, surface, background=None):
+
+        super().__init__(surface, background)
+
+        self.last_background = None  # 上一帧背景各层的滚动位置
+        self.last_state = {}  # 上一帧精灵的图像和矩形区域
+        self.invalid_rects = []  # 下一帧需要重绘的其他区域
+        self.full_count = 0  # 退回完整刷新的次数
+
+    def draw(self, layers):
+
+        # 窗口外的精灵不绘制，离开窗口的精灵按照被移除处理
+        visible_layers = self.cull(layers)
+
+        # 1. 收集脏矩形，包括上一帧标记需要重绘的区域
+        dirty_rects = self.invalid_rects
+        self.invalid_rects = []
+        current_state = {}
+
+        for sprite in (sprite for sprites in visible_layers for sprite in sprites):
+            image = sprite.image
+            rect = sprite.rect
+
+            current_state[sprite] = (image, rect.copy())
+            last = self.last_state.get(sprite)
+
+            if last is None:  # 新添加的精灵
+                dirty_rects.append(rect.copy())
+            elif last[0] is not image or last[1] != rect:  # 图像或位置变化
+                dirty_rects.append(last[1])
+                dirty_rects.append(rect.copy())
+
+        # 被移除的精灵原来所在的区域
+        for sprite, (image, rect) in self.last_state.items():
+            if sprite not in current_state:
+                dirty_rects.append(rect)
+
+        self.last_state = current_state
+
+        # 只保留窗口内部的区域
+        dirty_rects = [rect.clip(self.screen_rect) for rect in dirty_rects]
+        dirty_rects = [rect for rect in dirty_rects if rect.w > 0 and rect.h > 0]
+
+        # 2. 背景滚动或者变化区域过大，退回完整刷新
+        is_scrolled = False
+        if self.background is not None:
+            is_scrolled = self.background.positions != self.last_background
+            self.last_background = list(self.background.positions)
+
+        area = sum(rect.w * rect.h for rect in dirty_rects)
+        if is_scrolled or area >= self.screen_rect.w * self.screen_rect.h * self.full_ratio:
+            self.full_count += 1
+            self.draw_background()
+
+            for sprites in visible_layers:
+                self.blit_sprites(sprites)
+
+            return None
+
+        # 3. 在每个脏矩形内重绘背景，再逐层重绘相交的精灵
+        for dirty_rect in dirty_rects:
+            self.surface.set_clip(dirty_rect)
+            self.draw_background()
+
+            for sprites in visible_layers:
+                self.blit_sprites([sprite for sprite in sprites
+                                   if sprite.rect.colliderect(dirty_rect)])
+
+        self.surface.set_clip(None)
+
+        return dirty_rects
+
+    def invalidate(self, rect):
+
+        self.invalid_rects.append(rect.copy())
+
+    def stats(self):
+
+        stats = super().stats()
+        stats["full_frames"] = self.full_count
+
+        return stats
+
+
+# 渲染模式名称对应的渲染器类
+RENDERERS = {"full": FullRenderer, "dirty": DirtyRenderer}
@@ -0,0 +1,197 @@
+import struct
+
+import pygame
+
+# 录像文件标识及版本
+REPLAY_MAGIC = b"PGRP"
+REPLAY_VERSION = 2
+
+# 文件头：(标识, 版本, 随机数种子, 实体后端序号)
+REPLAY_HEADER = struct.Struct("<4sBqB")
+# 输入记录：(连续相同的步数, 水平移动基数, 垂直移动基数, 按键位)，步数为 0 表示录像结束
+REPLAY_RUN = struct.Struct("<HbbB")
+# 文件尾：(模拟步数, 得分, 英雄水平位置, 英雄垂直位置)，用于校验回放结果
+REPLAY_FOOTER = struct.Struct("<IIhh")
+
+# 需要记录的按键，按键位依次是 1、2、4，同一步中的按键按照该顺序分发
+REPLAY_KEYS = (pygame.K_SPACE, pygame.K_b, pygame.K_ESCAPE)
+
+REPLAY_MAX_RUN = 0xFFFF  # 每条输入记录的最大步数
+
+# 实体后端，不同后端使用不同的随机数序列，回放时需要使用录像时的后端
+REPLAY_BACKENDS = ("sprite", "numpy")
+
+
+def keys_to_bits(keys_down):
+    """将按键列表转换为按键位，不需要记录的按键被忽略
+
+    :param keys_down: 按下的按键列表
+    :return: 按键位
+    """
+    bits = 0
+
+    for index, key in enumerate(REPLAY_KEYS):
+        if key in keys_down:
+            bits |= 1 << index
+
+    return bits
+
+
+def bits_to_keys(bits):
+    """将按键位转换为按键列表
+
+    :param bits: 按键位
+    :return: 按下的按键列表
+    """
+    return [key for index, key in enumerate(REPLAY_KEYS) if bits & (1 << index)]
+
+
+def game_state(game):
+    """游戏状态摘要，与文件尾的格式相同
+
+    :param game: 游戏对象
+    :return: (模拟步数, 得分, 英雄水平位置, 英雄垂直位置)
+    """
+    return (game.frame_count, game.hud_panel.score,
+            game.hero.rect.x, game.hero.rect.y)
+
+
+class ReplayRecorder(object):
+    """录像记录类
+
+    包装其他输入源，将每一步的移动基数及按键写入录像文件，
+    连续相同的输入合并为 1 条记录，没有操作的时段只占很少的空间。
+    计划任务按照模拟时间执行，只要随机数种子和输入相同就会在相同的步执行
+    """
+
+    def __init__(self, source, filename, seed, entity_backend="sprite"):
+        """初始化方法
+
+        :param source: 被记录的输入源
+        :param filename: 录像文件名
+        :param seed: 游戏使用的随机数种子
+        :param entity_backend: 游戏使用的实体后端
+        """
+        self.source = source
+        self.seed = seed
+
+        self.file = open(filename, "wb")
+        self.file.write(REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, seed,
+                                           REPLAY_BACKENDS.index(entity_backend)))
+
+        self.record = None  # 当前输入记录，(水平移动基数, 垂直移动基数, 按键位)
+        self.run_length = 0  # 当前输入记录连续相同的步数
+        self.run_count = 0  # 已经写入的输入记录数量
+
+    def poll(self, game):
+        """读取被记录输入源的输入并记录
+
+        :param game: 游戏对象
+        :return: (水平移动基数, 垂直移动基数, 本帧按下的按键列表)
+        """
+        move_hor, move_ver, keys_down = self.source.poll(game)
+
+        bits = keys_to_bits(keys_down)
+        record = (move_hor, move_ver, bits)
+
+        if record == self.record and self.run_length < REPLAY_MAX_RUN:
+            self.run_length += 1
+        else:
+            self.write_run()
+
+            self.record = record
+            self.run_length = 1
+
+        # 记录的按键按照固定顺序分发，保证回放时的处理顺序相同，其他按键（例如 F3）保持不变
+        other_keys = [key for key in keys_down if key not in REPLAY_KEYS]
+
+        return move_hor, move_ver, bits_to_keys(bits) + other_keys
+
+    def write_run(self):
+        """写入当前输入记录"""
+
+        if self.run_length == 0:
+            return
+
+        self.file.write(REPLAY_RUN.pack(self.run_length, *self.record))
+
+        self.run_count += 1
+        self.run_length = 0
+
+    def close(self, game):
+        """写入剩余的输入记录及文件尾，游戏结束之后调用
+
+        :param game: 游戏对象
+        """
+        self.write_run()
+
+        self.file.write(REPLAY_RUN.pack(0, 0, 0, 0))
+        self.file.write(REPLAY_FOOTER.pack(*game_state(game)))
+        self.file.close()
+
+
+class ReplayInput(object):
+    """录像输入源类，按照录像文件中的记录代替玩家操作"""
+
+    def __init__(self, filename):
+        """初始化方法，读取整个录像文件
+
+        :param filename: 录像文件名
+        """
+        with open(filename, "rb") as file:
+            data = file.read()
+
+        magic, version, self.seed, backend = REPLAY_HEADER.unpack_from(data)
+
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError("%s 不是可以识别的录像文件" % filename)
+
+        self.entity_backend = REPLAY_BACKENDS[backend]  # 录像时使用的实体后端
+
+        # 输入记录列表，每一项是 (步数, 水平移动基数, 垂直移动基数, 按键位)
+        self.runs = []
+        offset = REPLAY_HEADER.size
+
+        while True:
+            run = REPLAY_RUN.unpack_from(data, offset)
+            offset += REPLAY_RUN.size
+
+            if run[0] == 0:
+                break
+
+            self.runs.append(run)
+
+        # 录像结束时的游戏状态
+        self.expected_state = REPLAY_FOOTER.unpack_from(data, offset)
+        self.frame_count = self.expected_state[0]
+
+        self.run_index = 0  # 当前输入记录的下标
+        self.run_remain = self.runs[0][0] if self.runs else 0  # 当前输入记录剩余的步数
+
+    def poll(self, game):
+        """读取当前帧的输入，录像播放完之后返回 ESC 按键
+
+        :param game: 游戏对象
+        :return: (水平移动基数, 垂直移动基数, 本帧按下的按键列表)
+        """
+        while self.run_remain == 0:
+            self.run_index += 1
+
+            if self.run_index >= len(self.runs):
+                return 0, 0, [pygame.K_ESCAPE]
+
+            self.run_remain = self.runs[self.run_index][0]
+
+        self.run_remain -= 1
+
+        _, move_hor, move_ver, bits = self.runs[self.run_index]
+
+        return move_hor, move_ver, bits_to_keys(bits)
+
+    def verify(self, game):
+        """比较回放结束时与录像结束时的游戏状态
+
+        :param game: 游戏对象
+        :return: 状态一致返回 True，否则返回 False
+        """
+        return game_state(game) == self.expected_state
@@ -0,0 +1,314 @@
+"""长时间运行测试
+
+使用机器人无头运行游戏若干模拟小时，游戏结束时自动重新开始，并定期暂停和恢复，
+按照固定的模拟时间间隔记录进程常驻内存、tracemalloc 跟踪的内存和各类对象的数量，
+预热之后使用线性回归计算每小时的增长量，持续增长超过上限时以非 0 状态退出
+
+    python game_soak.py --hours 1                  运行 1 个模拟小时
+    python game_soak.py --hours 8 --csv soak.csv   运行 8 个模拟小时，并保存每次采样的记录
+"""
+import collections
+import contextlib
+import csv
+import gc
+import io
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+from game_sweep import *
+
+# 需要统计数量的对象类型名称，Surface 和 Mask 不被垃圾回收器跟踪，通过引用它们的对象统计
+SOAK_TYPES = ("Bullet", "Enemy", "EnemyView", "Supply", "Label", "Surface", "Mask")
+
+# 每个模拟小时允许的增长量，内存单位 KB，对象单位个
+SOAK_LIMITS = {"rss_kb": 2048, "traced_kb": 1024}
+SOAK_OBJECT_LIMIT = 50
+
+SOAK_PAUSE_PERIOD = 10 * 60 * SIM_RATE  # 机器人每隔多少步暂停 1 次
+SOAK_PAUSE_STEPS = 2 * SIM_RATE  # 每次暂停的步数
+SOAK_WARMUP = 0.25  # 计算增长量时忽略的预热采样比例，缓存在预热期间填满
+
+
+def soak_policy(rng):
+    """在 hunter 策略的基础上，游戏结束时重新开始，并定期暂停和恢复的策略
+
+    :param rng: 随机数生成器
+    :return: 策略函数
+    """
+    policy = hunter_policy(rng)
+
+    def play(game):
+        # 游戏结束之后等待 1 秒再重新开始，覆盖游戏结束面板的显示
+        if game.is_game_over:
+            return 0, 0, (pygame.K_SPACE,) if game.frame_count % SIM_RATE == 0 else ()
+
+        # 暂停和恢复时面板会重新添加标签精灵
+        phase = game.frame_count % SOAK_PAUSE_PERIOD
+        if game.is_pause:
+            return 0, 0, (pygame.K_SPACE,) if phase >= SOAK_PAUSE_STEPS else ()
+
+        if phase == 0:
+            return 0, 0, (pygame.K_SPACE,)
+
+        return policy(game)
+
+    return play
+
+
+def read_rss_kb():
+    """读取进程的常驻内存
+
+    :return: 常驻内存 KB 数，不是 Linux 系统时返回 None
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            pages = int(file.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+
+    return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def count_objects(type_names=SOAK_TYPES):
+    """按照类型名称统计对象数量
+
+    垃圾回收器只跟踪容器对象，不跟踪的对象（例如 Surface 和 Mask）
+    通过被跟踪对象的引用查找，同一个对象只统计 1 次
+
+    :param type_names: 类型名称列表
+    :return: 类型名称对应的数量字典
+    """
+    counts = collections.Counter()
+    seen = set()
+
+    for obj in gc.get_objects():
+        name = type(obj).__name__
+        if name in type_names:
+            counts[name] += 1
+
+        for referent in gc.get_referents(obj):
+            if gc.is_tracked(referent) or id(referent) in seen:
+                continue
+
+            name = type(referent).__name__
+            if name in type_names:
+                seen.add(id(referent))
+                counts[name] += 1
+
+    return {name: counts[name] for name in type_names}
+
+
+def slope(xs, ys):
+    """最小二乘线性回归的斜率
+
+    :param xs: 自变量列表
+    :param ys: 因变量列表
+    :return: 斜率，采样少于 2 个时返回 0
+    """
+    if len(xs) < 2:
+        return 0.0
+
+    mean_x = statistics.mean(xs)
+    mean_y = statistics.mean(ys)
+    variance = sum((x - mean_x) ** 2 for x in xs)
+
+    if variance == 0:
+        return 0.0
+
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance
+
+
+class SoakRunner(object):
+    """长时间运行测试类"""
+
+    def __init__(self, hours=1.0, interval=60, seed=0, is_render=True, is_tracemalloc=True):
+        """初始化方法
+
+        :param hours: 运行的模拟小时数
+        :param interval: 采样间隔，单位模拟秒
+        :param seed: 随机数种子
+        :param is_render: 是否渲染画面，渲染时会覆盖标签图像的生成
+        :param is_tracemalloc: 是否使用 tracemalloc 跟踪内存分配，会降低运行速度
+        """
+        self.max_frames = int(hours * 3600 * SIM_RATE)
+        self.interval = int(interval * SIM_RATE)
+        self.seed = seed
+        self.is_render = is_render
+        self.is_tracemalloc = is_tracemalloc
+
+        self.samples = []  # 采样记录列表，每一项是字典
+        self.baseline_snapshot = None  # 预热结束时的内存快照
+        self.last_snapshot = None  # 最后一次采样的内存快照
+
+    def run(self):
+        """运行游戏并定期采样
+
+        :return: 游戏对象
+        """
+        init_headless()
+
+        if self.is_tracemalloc:
+            tracemalloc.start()
+
+        game = Game(headless=True, seed=self.seed,
+                    input_source=ScriptedInput(soak_policy(random.Random(self.seed))),
+                    is_render=self.is_render)
+
+        warmup_frames = self.max_frames * SOAK_WARMUP
+        start_time = time.perf_counter()
+
+        # 游戏中的提示信息没有意义，丢弃
+        while game.frame_count < self.max_frames:
+            with contextlib.redirect_stdout(io.StringIO()):
+                game.start(min(game.frame_count + self.interval, self.max_frames))
+
+            self.sample(game, time.perf_counter() - start_time)
+
+            if self.baseline_snapshot is None and game.frame_count >= warmup_frames:
+                self.baseline_snapshot = self.last_snapshot
+
+            print("模拟 %.2f 小时，常驻内存 %s KB，对象 %s" %
+                  (self.samples[-1]["hours"], self.samples[-1]["rss_kb"],
+                   self.samples[-1]["objects"]))
+
+        if self.is_tracemalloc:
+            tracemalloc.stop()
+
+        return game
+
+    def sample(self, game, elapsed):
+        """记录 1 次采样
+
+        :param game: 游戏对象
+        :param elapsed: 已经运行的真实秒数
+        """
+        gc.collect()
+
+        traced_kb = None
+        if self.is_tracemalloc:
+            # 排除采样记录本身和 tracemalloc 的内存分配
+            self.last_snapshot = tracemalloc.take_snapshot().filter_traces(
+                (tracemalloc.Filter(False, tracemalloc.__file__),
+                 tracemalloc.Filter(False, __file__)))
+
+            traced_kb = sum(stat.size for stat in
+                            self.last_snapshot.statistics("filename")) // 1024
+
+        self.samples.append({"hours": game.frame_count / SIM_RATE / 3600,
+                             "elapsed": elapsed,
+                             "score": game.hud_panel.score,
+                             "rss_kb": read_rss_kb(),
+                             "traced_kb": traced_kb,
+                             "objects": count_objects()})
+
+    def series(self):
+        """预热之后各项指标的采样序列
+
+        :return: 指标名称对应的 (模拟小时列表, 数值列表) 字典，没有数据的指标不包含在内
+        """
+        samples = self.samples[int(len(self.samples) * SOAK_WARMUP):]
+        hours = [sample["hours"] for sample in samples]
+
+        result = {}
+        for name in SOAK_LIMITS:
+            values = [sample[name] for sample in samples]
+
+            if values and None not in values:
+                result[name] = (hours, values)
+
+        for name in SOAK_TYPES:
+            result[name] = (hours, [sample["objects"][name] for sample in samples])
+
+        return result
+
+    def report(self):
+        """计算各项指标每小时的增长量
+
+        整个预热之后的区间和后一半区间的增长量都超过上限时才算持续增长，
+        只在前期增长之后趋于平稳的缓存不算泄漏
+
+        :return: (指标名称对应的 (每小时增长量, 后一半每小时增长量, 上限) 字典, 持续增长的指标名称列表)
+        """
+        slopes = {}
+        failures = []
+
+        for name, (hours, values) in self.series().items():
+            half = len(hours) // 2
+            limit = SOAK_LIMITS.get(name, SOAK_OBJECT_LIMIT)
+
+            total_slope = slope(hours, values)
+            late_slope = slope(hours[half:], values[half:])
+
+            slopes[name] = (total_slope, late_slope, limit)
+
+            if total_slope > limit and late_slope > limit:
+                failures.append(name)
+
+        return slopes, failures
+
+    def top_growth(self, count=10):
+        """预热结束到最后一次采样之间，内存增长最多的代码位置
+
+        :param count: 位置数量
+        :return: tracemalloc 统计差异列表
+        """
+        if self.baseline_snapshot is None or self.last_snapshot is None:
+            return []
+
+        return self.last_snapshot.compare_to(self.baseline_snapshot, "lineno")[:count]
+
+    def save_csv(self, filename):
+        """将采样记录保存为 CSV 文件
+
+        :param filename: 文件名
+        """
+        with open(filename, "w", newline="") as file:
+            writer = csv.writer(file)
+
+            writer.writerow(("hours", "elapsed", "score", "rss_kb", "traced_kb") + SOAK_TYPES)
+
+            for sample in self.samples:
+                writer.writerow(["%.4f" % sample["hours"], "%.1f" % sample["elapsed"],
+                                 sample["score"], sample["rss_kb"], sample["traced_kb"]]
+                                + [sample["objects"][name] for name in SOAK_TYPES])
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="飞机大战长时间运行测试")
+    parser.add_argument("--hours", type=float, default=1.0, help="运行的模拟小时数")
+    parser.add_argument("--interval", type=float, default=60, help="采样间隔，单位模拟秒")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+    parser.add_argument("--no-render", action="store_true", help="不渲染画面，只运行模拟")
+    parser.add_argument("--no-tracemalloc", action="store_true",
+                        help="不使用 tracemalloc，运行更快，但是不统计 Python 内存分配")
+    parser.add_argument("--csv", default=None, help="保存每次采样记录的 CSV 文件名")
+    options = parser.parse_args()
+
+    runner = SoakRunner(options.hours, options.interval, options.seed,
+                        is_render=not options.no_render,
+                        is_tracemalloc=not options.no_tracemalloc)
+    runner.run()
+
+    if options.csv is not None:
+        runner.save_csv(options.csv)
+
+    slopes, failures = runner.report()
+
+    print("%-12s %14s %14s %10s" % ("metric", "per hour", "late per hour", "limit"))
+    for name, (total_slope, late_slope, limit) in slopes.items():
+        print("%-12s %14.1f %14.1f %10d%s" % (name, total_slope, late_slope, limit,
+                                              " !" if name in failures else ""))
+
+    for stat in runner.top_growth():
+        print(stat)
+
+    if failures:
+        print("持续增长: %s" % ", ".join(failures))
+        sys.exit(1)
+
+    print("没有发现持续增长")
@@ -0,0 +1,299 @@
+"""批量运行工具
+
+使用多个进程同时运行大量无头游戏，每局游戏使用不同的随机数种子、脚本机器人策略
+和参数组合，统计得分、存活时间、达到的级别和每秒模拟步数，用于调整关卡参数
+
+    python game_sweep.py --runs 100                        每个参数组合运行 100 局
+    python game_sweep.py --params params.json --workers 8  使用参数文件和 8 个进程
+
+参数文件是 JSON 列表，每一项是一个参数组合，key 是游戏对象上的属性路径，例如
+
+    [{"hud_panel.level2_score": 10000}, {"hud_panel.level2_score": 20000}]
+
+创建游戏时就要使用的参数（见 GAME_PARAMS）传给游戏的初始化方法，例如各级别新增的敌机
+
+    [{"level_enemies": {"1": [[0, 24, 180]], "2": [[0, 8, 300], [1, 4, 60]]}}]
+"""
+import concurrent.futures
+import contextlib
+import csv
+import io
+import json
+import os
+import statistics
+import time
+
+from game import *
+
+
+def idle_policy(rng):
+    """保持不动的策略
+
+    :param rng: 随机数生成器
+    :return: 策略函数
+    """
+
+    def policy(game):
+        return 0, 0, ()
+
+    return policy
+
+
+def sweep_policy(rng):
+    """左右往返移动的策略，每局往返的周期不同
+
+    :param rng: 随机数生成器
+    :return: 策略函数
+    """
+    period = rng.randint(60, 180)  # 往返一次的步数
+
+    def policy(game):
+        return (1 if game.frame_count % period < period // 2 else -1), 0, ()
+
+    return policy
+
+
+def hunter_policy(rng):
+    """追击最下方的敌机，躲避正上方的敌机，敌机较多时引爆炸弹的策略
+
+    :param rng: 随机数生成器
+    :return: 策略函数
+    """
+    bomb_count = rng.randint(4, 8)  # 窗口下半部分的敌机达到该数量时引爆炸弹
+
+    def policy(game):
+        hero = game.hero.rect
+        enemies = [enemy.rect for enemy in game.enemies_group
+                   if enemy.hp > 0 and enemy.rect.bottom > 0]
+
+        move_hor = 0
+        move_ver = 0
+        keys_down = []
+
+        # 1. 对准最下方的敌机
+        if enemies:
+            target = max(enemies, key=lambda x: x.bottom)
+            dx = target.centerx - hero.centerx
+            move_hor = (dx > 8) - (dx < -8)
+
+        # 2. 正上方的敌机距离过近时，向空旷的一侧躲避
+        for rect in enemies:
+            if (rect.right > hero.left and rect.left < hero.right
+                    and hero.top - 120 < rect.bottom <= hero.bottom):
+                move_hor = 1 if rect.centerx < hero.centerx else -1
+                move_ver = 1
+                break
+
+        # 3. 敌机较多时引爆炸弹
+        if sum(1 for rect in enemies if rect.top > SCREEN_RECT.centery) >= bomb_count:
+            keys_down.append(pygame.K_b)
+
+        return move_hor, move_ver, keys_down
+
+    return policy
+
+
+# 策略名称对应的策略工厂函数，参数是随机数生成器
+POLICIES = {"idle": idle_policy, "sweep": sweep_policy, "hunter": hunter_policy}
+
+# 每局结果的 CSV 字段
+RESULT_FIELDS = ("run", "seed", "policy", "params", "score", "level",
+                 "is_game_over", "frames", "survival", "elapsed", "fps")
+
+
+# 传给游戏初始化方法的参数名称，游戏创建之后再修改不会生效
+GAME_PARAMS = ("level_enemies",)
+
+
+def apply_params(game, params):
+    """将参数组合设置到游戏对象上
+
+    :param game: 游戏对象
+    :param params: 参数字典，key 是属性路径，例如 hud_panel.level2_score，忽略 GAME_PARAMS 中的参数
+    """
+    for path, value in params.items():
+        if path in GAME_PARAMS:
+            continue
+
+        names = path.split(".")
+
+        target = game
+        for name in names[:-1]:
+            target = getattr(target, name)
+
+        if not hasattr(target, names[-1]):
+            raise AttributeError("游戏对象没有属性 %s" % path)
+
+        setattr(target, names[-1], value)
+
+
+def init_worker():
+    """工作进程初始化，使用 dummy 驱动初始化 pygame"""
+    init_headless()
+
+
+def run_game(task):
+    """运行一局无头游戏，直到游戏结束或者达到最大步数，在工作进程中执行
+
+    :param task: (序号, 随机数种子, 策略名称, 参数字典, 最大步数, 是否渲染)
+    :return: 结果字典
+    """
+    run, seed, policy_name, params, max_frames, is_render = task
+
+    policy = POLICIES[policy_name](random.Random(seed))
+
+    def play(game):
+        # 游戏结束时退出
+        if game.is_game_over:
+            return 0, 0, (pygame.K_ESCAPE,)
+
+        return policy(game)
+
+    # 游戏中的提示信息没有意义，丢弃
+    with contextlib.redirect_stdout(io.StringIO()):
+        game = Game(headless=True, seed=seed, input_source=ScriptedInput(play),
+                    is_render=is_render,
+                    **{name: value for name, value in params.items() if name in GAME_PARAMS})
+        apply_params(game, params)
+
+        start_time = time.perf_counter()
+        game.start(max_frames)
+        elapsed = time.perf_counter() - start_time
+
+    return {"run": run,
+            "seed": seed,
+            "policy": policy_name,
+            "params": json.dumps(params, sort_keys=True),
+            "score": game.hud_panel.score,
+            "level": game.hud_panel.level,
+            # 没有结束的游戏达到了最大步数，存活时间只是下限
+            "is_game_over": game.hud_panel.lives_count == 0,
+            "frames": game.frame_count,
+            "survival": game.frame_count / SIM_RATE,
+            "elapsed": elapsed,
+            "fps": game.frame_count / elapsed if elapsed > 0 else 0.0}
+
+
+def run_sweep(tasks, workers=None):
+    """使用进程池运行全部任务
+
+    :param tasks: 任务列表，参数与 run_game 相同
+    :param workers: 进程数量，不传则使用 CPU 核数
+    :return: 按照任务顺序排列的结果列表
+    """
+    workers = workers or os.cpu_count() or 1
+
+    # 每次分发多个任务，减少进程间通信的次数
+    chunksize = max(1, len(tasks) // (workers * 4))
+
+    results = []
+    with concurrent.futures.ProcessPoolExecutor(workers, initializer=init_worker) as executor:
+        for result in executor.map(run_game, tasks, chunksize=chunksize):
+            results.append(result)
+
+            if len(results) % 100 == 0:
+                print("已完成 %d/%d 局" % (len(results), len(tasks)))
+
+    return results
+
+
+def summarize(results):
+    """按照策略和参数组合汇总结果
+
+    :param results: 结果列表
+    :return: 汇总列表，每一项是一个策略和参数组合的统计字典
+    """
+    groups = {}
+    for result in results:
+        groups.setdefault((result["policy"], result["params"]), []).append(result)
+
+    summary = []
+    for (policy_name, params), group in groups.items():
+        scores = [result["score"] for result in group]
+        levels = [result["level"] for result in group]
+
+        summary.append({
+            "policy": policy_name,
+            "params": json.loads(params),
+            "runs": len(group),
+            "score_mean": statistics.mean(scores),
+            "score_median": statistics.median(scores),
+            "score_min": min(scores),
+            "score_max": max(scores),
+            "survival_mean": statistics.mean(result["survival"] for result in group),
+            "game_over_ratio": sum(result["is_game_over"] for result in group) / len(group),
+            "levels": {level: levels.count(level) / len(levels)
+                       for level in sorted(set(levels))},
+            "fps_mean": statistics.mean(result["fps"] for result in group),
+        })
+
+    return summary
+
+
+def save_csv(results, filename):
+    """将每局结果保存为 CSV 文件
+
+    :param results: 结果列表
+    :param filename: 文件名
+    """
+    with open(filename, "w", newline="") as file:
+        writer = csv.DictWriter(file, RESULT_FIELDS)
+
+        writer.writeheader()
+        writer.writerows(results)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="批量运行飞机大战")
+    parser.add_argument("--runs", type=int, default=20,
+                        help="每个策略和参数组合运行的局数")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="第 1 局的随机数种子，之后每局加 1")
+    parser.add_argument("--policy", choices=sorted(POLICIES), action="append",
+                        help="机器人策略，可以指定多次，默认 hunter")
+    parser.add_argument("--params", default=None,
+                        help="参数组合 JSON 文件，默认只使用游戏的默认参数")
+    parser.add_argument("--frames", type=int, default=60 * SIM_RATE,
+                        help="每局最多运行的模拟步数")
+    parser.add_argument("--render", action="store_true",
+                        help="每步渲染画面，统计包含渲染的每秒步数")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="进程数量，默认使用 CPU 核数")
+    parser.add_argument("--csv", default="sweep_runs.csv",
+                        help="每局结果的 CSV 文件名")
+    parser.add_argument("--json", default="sweep_summary.json",
+                        help="汇总结果的 JSON 文件名")
+    options = parser.parse_args()
+
+    param_sets = [{}]
+    if options.params is not None:
+        with open(options.params) as file:
+            param_sets = json.load(file)
+
+    # 每个策略和参数组合使用相同的种子序列，结果之间可以直接比较
+    tasks = []
+    for policy_name in options.policy or ["hunter"]:
+        for params in param_sets:
+            for i in range(options.runs):
+                tasks.append((len(tasks), options.seed + i, policy_name, params,
+                              options.frames, options.render))
+
+    start = time.perf_counter()
+    results = run_sweep(tasks, options.workers)
+    elapsed = time.perf_counter() - start
+
+    save_csv(results, options.csv)
+
+    summary = summarize(results)
+    with open(options.json, "w") as file:
+        json.dump(summary, file, indent=2, ensure_ascii=False)
+
+    print("运行 %d 局，耗时 %.1f 秒，每秒 %.1f 局，结果已保存到 %s 和 %s" %
+          (len(results), elapsed, len(results) / elapsed, options.csv, options.json))
+
+    for item in summary:
+        print("%s %s: 平均得分 %.0f，平均存活 %.1f 秒，级别分布 %s" %
+              (item["policy"], json.dumps(item["params"]), item["score_mean"],
+               item["survival_mean"], item["levels"]))